@@ -0,0 +1,22 @@
+"""Othello engine: rules, search and scoring that run without the Tk interface.
+
+Typical use::
+
+    from othello_engine import Position, search
+
+    position = Position.initial()
+    result = search(position, time_limit=0.5)
+    position = position.apply_move(result.move)
+"""
+
+from .bitboard import (BOARD_SIZE, START_BLACK, START_WHITE, count, flips, from_rows, iter_squares, play,
+                       parse_square, row_col, square, square_name, to_rows)
+from .book import BookEntry, OpeningBook, load_book
+from .endgame import DEFAULT_ENDGAME_EMPTIES, EndgameResult, EndgameSolver, solve
+from .evaluate import FINAL_WEIGHT, disc_difference, evaluate, evaluate_batch, final_score
+from .parallel import ParallelSearcher, parallel_search
+from .patterns import PatternEvaluator
+from .position import Position, apply_move, legal_moves, opponent_of
+from .search import MAX_DEPTH, SearchResult, Searcher, search
+from .stats import RootMoveStats, SamplingProfiler, SearchStats
+from .transposition import TranspositionTable
@@ -0,0 +1,283 @@
+"""Benchmark suite: perft counts, fixed-depth searches and endgame solves on a fixed corpus.
+
+Usage (from the folder containing othello_engine)::
+
+    python -m othello_engine.bench --out bench.json
+    python -m othello_engine.bench --out new.json --compare bench.json
+
+The suite checks the number of move paths from the starting position (perft) against known
+values, times the move generator and the evaluator, searches every midgame position of the
+corpus to a fixed depth and solves every endgame position exactly. Each search reports its
+nodes, nodes per second and the time at which each depth was completed. With ``--memory`` each
+search is run a second time under ``tracemalloc`` to measure its peak Python memory; that run is
+not timed, since tracing slows the search down several times.
+
+The results are written as JSON. ``--compare`` prints the change from an earlier results file.
+The exit status is 1 when a perft count or an endgame margin is wrong, or when ``--max-slowdown``
+is given and the overall nodes per second dropped by more than that many percent.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from .bitboard import START_BLACK, START_WHITE, count, iter_squares, legal_moves, play, square_name
+from .endgame import EndgameSolver
+from .evaluate import evaluate
+from .patterns import np
+from .records import position_after
+from .search import Searcher
+from .transposition import TranspositionTable
+
+try:
+    import resource
+except ImportError:  # Not available on Windows: the process peak memory is then left out
+    resource = None
+
+FORMAT_VERSION = 1
+
+# Number of move paths of each length from the starting position; a forced pass counts as a move
+PERFT_COUNTS = (1, 4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288)
+
+# Games played from the starting position, as move strings, up to the benchmark position
+MIDGAME = (
+    ('mid-40', 'd3c5f6e3d6e6f7c6c4b4b6d7c3a6e7e8f8b2a1c2'),
+    ('mid-36', 'c4e3f6c5f4f5e6d3f3d6g6g5c6f2h5b7c7b3a8h6h7e7c3b5'),
+    ('mid-32', 'd3e3f4c3d6d7c2d2c4c5f3f2e6e7f6f5d8b4e2c6g6g5h4f1b2b3a5c1'),
+    ('mid-28', 'c4e3f6c5e2c3b4g7d3f2e6f5d6b6g2a4f4e7e8g3c6f1h2f3e1h1a7d7c7g1h8d1'),
+    ('mid-24', 'd3e3f4c3d2e2f3c4c2e1c5d6c6b5b6b4d1f1g1c1b1f2g3c7a5a6a7g4h5a4a3b3g5h4h3h6'),
+    ('mid-20', 'f5d6c3f4c5c4d3e6c6e3e7b5f6g5b3b4e2c2d2f3c1e8f7f8f2d1e1f1a3b1a4a6a5a2h5h6g6c7h7b6'),
+)
+
+# Endgame positions in the same form, with the exact final margin for the side to move
+ENDGAME = (
+    ('end-14', 'd3c5c6e3c4d6f5f6f2e2f3c3d7g3d2b6a7f1f4b5e1d1a5g4c1b7g1c2h2h3h4b4a6c7b2a4a3a1e6g5f7g2h1b3g6d8',
+     22),
+    ('end-12', 'd3c5f6e3d6e6f7e7c6c4e2d7d8f8c7c8e8f5f4f3g6f2g3f1d1d2c1c2b6b4b5h2e1c3g4b1h3a5h1g2g1a6a1h5h4g5h6g7',
+     48),
+    ('end-10', 'd3c5f6f3f4f5e6d6c4c6e3c2b6d2d1c1e2c3b1e1f1f2g6g5h5h6h7e7g4d7c7g3b4b5a5h3g1b3d8b8f7a4c8e8f8g8a6g7h8b7',
+     40),
+)
+
+
+def perft(own, opp, depth):
+    """Count the move paths of ``depth`` plies from (own, opp); finished games count as one path."""
+    if depth == 0:
+        return 1
+    moves = legal_moves(own, opp)
+    if not moves:
+        if not legal_moves(opp, own):
+            return 1
+        return perft(opp, own, depth - 1)  # Pass
+    if depth == 1:
+        return count(moves)
+    total = 0
+    for sq in iter_squares(moves):
+        new_own, new_opp = play(own, opp, sq)
+        total += perft(new_opp, new_own, depth - 1)
+    return total
+
+
+def rate(amount, seconds):
+    """Amount per second, rounded, or 0 when the time is too short to measure."""
+    return round(amount / seconds) if seconds > 0 else 0
+
+
+def peak_memory_kb(function, *args):
+    """Run ``function(*args)`` under tracemalloc and return its peak Python allocation in KiB."""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return round(tracemalloc.get_traced_memory()[1] / 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_perft(max_depth, log):
+    """Run perft from the starting position for every depth up to ``max_depth``."""
+    results = []
+    for depth in range(1, max_depth + 1):
+        start = time.perf_counter()
+        nodes = perft(START_BLACK, START_WHITE, depth)
+        seconds = time.perf_counter() - start
+        expected = PERFT_COUNTS[depth] if depth < len(PERFT_COUNTS) else None
+        results.append({'depth': depth, 'nodes': nodes, 'expected': expected, 'ok': expected in (None, nodes),
+                        'seconds': round(seconds, 4), 'nps': rate(nodes, seconds)})
+        print(f"perft {depth}: {nodes} {'ok' if results[-1]['ok'] else f'WRONG, expected {expected}'}"
+              f" ({seconds:.3f} s)", file=log)
+    return results
+
+
+def bench_micro(positions, repeat, log):
+    """Time move generation, move making and evaluation over the corpus positions."""
+    pairs = [(position.own, position.opp) for position in positions]
+    moves = [(own, opp, list(iter_squares(legal_moves(own, opp)))) for own, opp in pairs]
+    tests = {
+        'legal_moves': lambda: [legal_moves(own, opp) for own, opp in pairs],
+        'play': lambda: [play(own, opp, sq) for own, opp, squares in moves for sq in squares],
+        'evaluate': lambda: [evaluate(own, opp) for own, opp in pairs],
+    }
+    calls = {'legal_moves': len(pairs), 'play': sum(len(squares) for _, _, squares in moves),
+             'evaluate': len(pairs)}
+    results = []
+    for name, test in tests.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            test()
+        seconds = time.perf_counter() - start
+        total = calls[name] * repeat
+        results.append({'name': name, 'calls': total, 'seconds': round(seconds, 4),
+                        'per_second': rate(total, seconds)})
+        print(f"{name}: {results[-1]['per_second']} calls/s", file=log)
+    return results
+
+
+def run_search(position, depth, iterations=None):
+    """Search ``position`` to ``depth`` with a fresh Searcher, so node counts are reproducible."""
+    searcher = Searcher(evaluate, TranspositionTable(), endgame_empties=0)
+    start = time.perf_counter()
+
+    def on_iteration(result):
+        if iterations is not None:
+            iterations.append([result.depth, round(time.perf_counter() - start, 4), result.nodes])
+
+    return searcher.search(position, depth, on_iteration=on_iteration)
+
+
+def bench_search(depth, memory, log):
+    """Search every midgame position of the corpus to ``depth`` plies."""
+    results = []
+    for name, moves in MIDGAME:
+        position = position_after(moves)
+        iterations = []
+        start = time.perf_counter()
+        result = run_search(position, depth, iterations)
+        seconds = time.perf_counter() - start
+        results.append({'name': name, 'empties': position.empties, 'move': square_name(result.move),
+                        'score': result.score, 'depth': result.depth, 'nodes': result.nodes,
+                        'seconds': round(seconds, 4), 'nps': rate(result.nodes, seconds),
+                        'time_to_depth': iterations,
+                        'peak_kb': peak_memory_kb(run_search, position, depth) if memory else None})
+        print(f"{name}: {square_name(result.move)} {result.score:+d} depth {result.depth}, "
+              f"{result.nodes} nodes in {seconds:.3f} s ({results[-1]['nps']} nps)", file=log)
+    return results
+
+
+def bench_endgame(memory, log):
+    """Solve every endgame position of the corpus exactly and check the margins."""
+    results = []
+    for name, moves, expected in ENDGAME:
+        position = position_after(moves)
+        start = time.perf_counter()
+        solved = EndgameSolver().solve(position)
+        seconds = time.perf_counter() - start
+        results.append({'name': name, 'empties': position.empties, 'move': square_name(solved.move),
+                        'margin': solved.margin, 'expected': expected, 'ok': expected in (None, solved.margin),
+                        'nodes': solved.nodes, 'seconds': round(seconds, 4), 'nps': rate(solved.nodes, seconds),
+                        'peak_kb': peak_memory_kb(EndgameSolver().solve, position) if memory else None})
+        status = 'ok' if results[-1]['ok'] else f'WRONG, expected {expected:+d}'
+        print(f"{name}: {square_name(solved.move)} {solved.margin:+d} {status}, "
+              f"{solved.nodes} nodes in {seconds:.3f} s ({results[-1]['nps']} nps)", file=log)
+    return results
+
+
+def run(perft_depth=7, depth=6, repeat=200, memory=False, log=sys.stdout):
+    """Run the whole suite and return the results as a JSON-compatible dict."""
+    positions = [position_after(entry[1]) for entry in MIDGAME + ENDGAME]
+    report = {
+        'version': FORMAT_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np is not None,
+        'settings': {'perft_depth': perft_depth, 'depth': depth, 'repeat': repeat, 'memory': memory},
+        'perft': bench_perft(perft_depth, log),
+        'micro': bench_micro(positions, repeat, log),
+        'search': bench_search(depth, memory, log),
+        'endgame': bench_endgame(memory, log),
+    }
+    searches = report['search'] + report['endgame']
+    nodes = sum(entry['nodes'] for entry in searches)
+    seconds = sum(entry['seconds'] for entry in searches)
+    report['totals'] = {
+        'nodes': nodes,
+        'seconds': round(seconds, 4),
+        'nps': rate(nodes, seconds),
+        'ok': all(entry['ok'] for entry in report['perft'] + report['endgame']),
+        # Peak resident size of the whole process, in KiB on Linux and in bytes on macOS
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None,
+    }
+    print(f"total: {nodes} nodes in {seconds:.3f} s ({report['totals']['nps']} nps)", file=log)
+    return report
+
+
+def percent_change(old, new):
+    """Relative change from ``old`` to ``new`` in percent, or None when ``old`` is zero."""
+    return round(100 * (new - old) / old, 1) if old else None
+
+
+def compare(old, new, log=sys.stdout):
+    """Print how ``new`` results differ from ``old`` ones and return the overall NPS change in percent.
+
+    Searches whose move, score or node count changed are listed, since those numbers only move when
+    the engine's behaviour does.
+    """
+    if old.get('settings', {}).get('depth') != new['settings']['depth']:
+        print("warning: the two runs searched to different depths", file=log)
+    for section, key in (('micro', 'per_second'), ('search', 'nps'), ('endgame', 'nps')):
+        previous = {entry['name']: entry for entry in old.get(section, ())}
+        for entry in new[section]:
+            before = previous.get(entry['name'])
+            if before is None:
+                continue
+            change = percent_change(before[key], entry[key])
+            line = f"{entry['name']}: {before[key]} -> {entry[key]} {key}"
+            if change is not None:
+                line += f" ({change:+.1f}%)"
+            if section != 'micro':
+                differences = [f"{field} {before[field]} -> {entry[field]}"
+                               for field in ('move', 'score', 'margin', 'nodes')
+                               if field in entry and before.get(field) != entry[field]]
+                if differences:
+                    line += ", changed: " + ", ".join(differences)
+            print(line, file=log)
+    change = percent_change(old['totals']['nps'], new['totals']['nps'])
+    print(f"total: {old['totals']['nps']} -> {new['totals']['nps']} nps"
+          + (f" ({change:+.1f}%)" if change is not None else ""), file=log)
+    return change
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--out', default='bench.json', help="file the JSON results are written to")
+    parser.add_argument('--compare', metavar='FILE', help="earlier results file to compare with")
+    parser.add_argument('--perft-depth', type=int, default=7, help="deepest perft count to check")
+    parser.add_argument('--depth', type=int, default=6, help="depth of the midgame searches")
+    parser.add_argument('--repeat', type=int, default=200, help="passes over the corpus for the move and "
+                                                                "evaluation timings")
+    parser.add_argument('--memory', action='store_true', help="also measure the peak memory of each search")
+    parser.add_argument('--max-slowdown', type=float, metavar='PERCENT',
+                        help="fail if the total nodes per second dropped by more than this against --compare")
+    args = parser.parse_args(argv)
+
+    old = None
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)  # Read first: --out may name the same file
+    report = run(args.perft_depth, args.depth, args.repeat, args.memory)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=1)
+    failed = not report['totals']['ok']
+    if old is not None:
+        change = compare(old, report)
+        if args.max_slowdown is not None and change is not None and change < -args.max_slowdown:
+            print(f"nodes per second dropped by {-change:.1f}%, more than {args.max_slowdown}%")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
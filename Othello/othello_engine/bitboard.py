@@ -0,0 +1,147 @@
+"""Bitboard move generation and disc flipping for an 8x8 Othello board.
+
+A position is stored as two 64-bit integers, one per colour. Bit ``row * 8 + col``
+is set when that colour has a disc on the square (row 0 is the top of the board,
+column 0 is the left-hand side).
+"""
+
+BOARD_SIZE = 8  # The board is always 8x8 so that every square fits in a 64-bit integer
+FULL = 0xFFFFFFFFFFFFFFFF  # All 64 squares set
+
+# Masks that stop discs from wrapping around from one side of the board to the other
+NOT_LEFT_COLUMN = 0xFEFEFEFEFEFEFEFE  # Every square except column 0
+NOT_RIGHT_COLUMN = 0x7F7F7F7F7F7F7F7F  # Every square except column 7
+
+# The eight directions as (shift, mask) pairs; a positive shift moves towards higher bit indexes
+DIRECTIONS = (
+    (1, NOT_LEFT_COLUMN),  # Right
+    (-1, NOT_RIGHT_COLUMN),  # Left
+    (8, FULL),  # Down
+    (-8, FULL),  # Up
+    (9, NOT_LEFT_COLUMN),  # Down-right
+    (7, NOT_RIGHT_COLUMN),  # Down-left
+    (-7, NOT_LEFT_COLUMN),  # Up-right
+    (-9, NOT_RIGHT_COLUMN),  # Up-left
+)
+
+# Standard starting position: white on d4/e5, black on e4/d5
+START_BLACK = (1 << (3 * 8 + 4)) | (1 << (4 * 8 + 3))
+START_WHITE = (1 << (3 * 8 + 3)) | (1 << (4 * 8 + 4))
+
+
+def square(row, col):
+    """Return the bit index of the square at (row, col)."""
+    return row * BOARD_SIZE + col
+
+
+def row_col(sq):
+    """Return the (row, col) pair of a bit index."""
+    return divmod(sq, BOARD_SIZE)
+
+
+def square_name(sq):
+    """Return the usual name of a square, from 'a1' (top left) to 'h8' (bottom right)."""
+    row, col = row_col(sq)
+    return "abcdefgh"[col] + str(row + 1)
+
+
+def parse_square(name):
+    """Return the bit index of a square name such as 'f5' (case-insensitive)."""
+    col = "abcdefgh".index(name[0].lower())
+    row = int(name[1]) - 1
+    if not 0 <= row < BOARD_SIZE:
+        raise ValueError(f"not a square: {name!r}")
+    return square(row, col)
+
+
+def legal_moves(own, opp):
+    """Return a bitmask of every square where ``own`` may legally play."""
+    empty = ~(own | opp) & FULL
+    moves = 0
+    for shift, mask in DIRECTIONS:
+        if shift > 0:
+            # Run of opponent discs that starts next to one of our discs
+            x = (own << shift) & mask & opp
+            x |= (x << shift) & mask & opp
+            x |= (x << shift) & mask & opp
+            x |= (x << shift) & mask & opp
+            x |= (x << shift) & mask & opp
+            x |= (x << shift) & mask & opp
+            moves |= (x << shift) & mask & empty  # The square just past the run must be empty
+        else:
+            shift = -shift
+            x = (own >> shift) & mask & opp
+            x |= (x >> shift) & mask & opp
+            x |= (x >> shift) & mask & opp
+            x |= (x >> shift) & mask & opp
+            x |= (x >> shift) & mask & opp
+            x |= (x >> shift) & mask & opp
+            moves |= (x >> shift) & mask & empty
+    return moves
+
+
+def flips(own, opp, sq):
+    """Return the bitmask of opponent discs flipped when ``own`` plays on square ``sq``."""
+    move = 1 << sq
+    flipped = 0
+    for shift, mask in DIRECTIONS:
+        line = 0  # Opponent discs seen so far in this direction
+        if shift > 0:
+            x = (move << shift) & mask
+            while x & opp:
+                line |= x
+                x = (x << shift) & mask
+        else:
+            x = (move >> -shift) & mask
+            while x & opp:
+                line |= x
+                x = (x >> -shift) & mask
+        if x & own:  # The run is closed by one of our discs, so it flips
+            flipped |= line
+    return flipped
+
+
+def play(own, opp, sq):
+    """Play ``own`` on ``sq`` and return the new (own, opp) pair.
+
+    The caller is responsible for checking that the move is legal.
+    """
+    flipped = flips(own, opp, sq)
+    return own | flipped | (1 << sq), opp & ~flipped
+
+
+def count(bits):
+    """Return the number of discs in a bitmask."""
+    return bits.bit_count()
+
+
+def iter_squares(bits):
+    """Yield the bit index of every set square, lowest first."""
+    while bits:
+        low = bits & -bits  # Isolate the lowest set bit
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def from_rows(board):
+    """Convert a list-of-lists board of 'B', 'W' and ' ' into a (black, white) pair."""
+    black = white = 0
+    for row in range(BOARD_SIZE):
+        for col in range(BOARD_SIZE):
+            if board[row][col] == 'B':
+                black |= 1 << square(row, col)
+            elif board[row][col] == 'W':
+                white |= 1 << square(row, col)
+    return black, white
+
+
+def to_rows(black, white):
+    """Convert a (black, white) pair back into a list-of-lists board."""
+    board = [[' ' for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+    for sq in iter_squares(black):
+        row, col = row_col(sq)
+        board[row][col] = 'B'
+    for sq in iter_squares(white):
+        row, col = row_col(sq)
+        board[row][col] = 'W'
+    return board
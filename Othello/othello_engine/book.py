@@ -0,0 +1,118 @@
+"""Opening book stored in a sorted, memory-mapped binary file.
+
+Positions are stored from the point of view of the side to move, as (own, opp) bitboards reduced
+to the smallest of their eight symmetric forms, so transposed and mirrored openings share one
+entry. Records are sorted by (own, opp) and looked up by binary search directly in the mapped
+file, so only the pages touched by a lookup are ever read.
+
+File layout: a header (magic, version, record count) followed by fixed-size little-endian
+records of own, opp, score, move, depth and games.
+"""
+
+import mmap
+import os
+import struct
+from typing import NamedTuple, Optional
+
+from .symmetry import INVERSE_SQUARE_MAPS, canonical
+
+BOOK_PATH = os.path.join(os.path.dirname(__file__), 'data', 'book.bin')
+MAGIC = b'OTBK'  # File signature
+VERSION = 1
+HEADER = struct.Struct('<4sHxxI')  # Magic, version, number of records
+RECORD = struct.Struct('<QQibBH')  # own, opp, score, move (-1 for none), search depth, games seen
+KEY = struct.Struct('<QQ')  # The leading (own, opp) part of a record
+
+
+class BookEntry(NamedTuple):
+    """A book position: its best move (a square in the caller's orientation) and its score.
+
+    ``depth`` is the depth the position was searched to and ``games`` how many of the source
+    games reached it.
+    """
+
+    move: Optional[int]
+    score: int
+    depth: int
+    games: int
+
+
+class OpeningBook:
+    """Read-only view of a book file; lookups cost O(log n) record reads from the mapped file."""
+
+    def __init__(self, path=BOOK_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, self.size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} opening book")
+            # An empty mapping is not allowed, so an empty book just keeps no map
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        """Release the memory map."""
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+
+    def find(self, own, opp):
+        """Return the raw record tuple stored for canonical (own, opp), or None."""
+        key = (own, opp)
+        low, high = 0, self.size
+        while low < high:  # Binary search over the sorted records
+            mid = (low + high) // 2
+            offset = HEADER.size + mid * RECORD.size
+            mid_key = KEY.unpack_from(self.data, offset)
+            if mid_key < key:
+                low = mid + 1
+            elif mid_key > key:
+                high = mid
+            else:
+                return RECORD.unpack_from(self.data, offset)
+        return None
+
+    def lookup(self, position):
+        """Return the BookEntry for a Position, or None when the book does not know it."""
+        if not self.size:
+            return None
+        own, opp, sym = canonical(position.own, position.opp)
+        record = self.find(own, opp)
+        if record is None:
+            return None
+        _, _, score, move, depth, games = record
+        if move >= 0:
+            move = INVERSE_SQUARE_MAPS[sym][move]  # Back into the orientation of the position
+        else:
+            move = None
+        return BookEntry(move, score, depth, games)
+
+    def records(self):
+        """Yield every record as a tuple (own, opp, score, move, depth, games), in file order."""
+        for index in range(self.size):
+            yield RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+
+
+def write_book(path, records):
+    """Write (own, opp, score, move, depth, games) records, already canonical, to a book file.
+
+    Duplicate keys keep the last record given.
+    """
+    merged = {}
+    for own, opp, score, move, depth, games in records:
+        merged[own, opp] = (score, move, depth, min(games, 0xFFFF))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(merged)))
+        for (own, opp), (score, move, depth, games) in sorted(merged.items()):
+            f.write(RECORD.pack(own, opp, score, move, depth, games))
+    os.replace(tmp_path, path)  # Readers never see a half-written book
+
+
+def load_book(path=BOOK_PATH):
+    """Open the book at ``path``, or return None if there is no book file."""
+    if not os.path.exists(path):
+        return None
+    return OpeningBook(path)
@@ -0,0 +1,148 @@
+"""Build or grow the opening book from self-play games and imported game transcripts.
+
+Usage (from the folder containing othello_engine)::
+
+    python -m othello_engine.build_book --self-play 200 --plies 12 --depth 6
+    python -m othello_engine.build_book --import games.txt --plies 14
+
+Imported games can come from text files with one game per line written as concatenated moves,
+for example ``f5d6c3d3c4f4`` (passes are implied), from WTHOR databases (``.wtb``) or from game
+files (``.otg``, see ``othello_engine.records``); they are streamed one game at a time
+rather than loaded.
+Games with an illegal move are skipped. Every position reached within the first ``--plies`` moves
+is reduced to its canonical symmetric form, searched to ``--depth`` plies and written to the
+book together with its best move and score. The position reached by each best move is added
+as well, so the book always knows how to continue its own lines. Positions already in the book
+keep their entry unless the new search is deeper.
+"""
+
+import argparse
+import random
+import sys
+from collections import Counter
+
+from .book import BOOK_PATH, load_book, write_book
+from .position import Position
+from .records import read_games
+from .search import Searcher
+from .symmetry import canonical
+
+
+def game_positions(moves, plies):
+    """Yield the positions before each of the first ``plies`` moves of a game given as squares."""
+    position = Position.initial()
+    for ply, sq in enumerate(moves):
+        if position.must_pass():
+            position = position.pass_turn()
+        if ply >= plies or not position.is_legal(sq):
+            return
+        yield position
+        position = position.apply_move(sq)
+
+
+def count_position(position, ply, counts, first_ply):
+    """Count one occurrence of ``position`` at ``ply`` under its canonical key."""
+    key = canonical(position.own, position.opp)[:2]
+    counts[key] += 1
+    first_ply[key] = min(ply, first_ply.get(key, ply))
+
+
+def collect_transcripts(paths, plies, counts, first_ply):
+    """Count the canonical positions of every game in the transcript files, WTHOR databases or game files."""
+    for path in paths:
+        for record in read_games(path):
+            for ply, position in enumerate(game_positions(record.moves, plies)):
+                count_position(position, ply, counts, first_ply)
+
+
+def collect_self_play(games, plies, randomness, rng, counts, first_ply):
+    """Play ``games`` quick games and count the canonical positions of their first ``plies`` moves.
+
+    Each move is random with probability ``randomness``, otherwise the best move of a 2-ply search,
+    so the games spread over the likely openings.
+    """
+    searcher = Searcher()
+    for _ in range(games):
+        position = Position.initial()
+        for ply in range(plies):
+            if position.must_pass():
+                position = position.pass_turn()
+            moves = position.legal_moves()
+            if not moves:
+                break
+            count_position(position, ply, counts, first_ply)
+            if rng.random() < randomness:
+                move = rng.choice(moves)
+            else:
+                move = searcher.search(position, 2).move
+            position = position.apply_move(move)
+
+
+def build(counts, first_ply, plies, depth, existing, min_games=1, log=sys.stderr):
+    """Search every counted position and return the book records, merged with ``existing`` ones."""
+    records = {(own, opp): [score, move, book_depth, games]
+               for own, opp, score, move, book_depth, games in existing}
+    searcher = Searcher()
+    todo = [key for key, games in counts.items() if games >= min_games]
+    queued = set(todo)
+    done = 0
+    while todo:
+        own, opp = key = todo.pop()
+        done += 1
+        games = counts[key]
+        position = Position(own, opp, 'B')  # Canonical positions are stored with the mover as 'own'
+        record = records.get(key)
+        if record is not None and record[2] >= depth:
+            record[3] += games  # Already searched deeply enough: just count the new games
+            move = record[1]
+        elif position.move_mask():
+            result = searcher.search(position, depth)
+            move = result.move
+            records[key] = [result.score, move, depth, games + (record[3] if record else 0)]
+        else:
+            continue
+        if move < 0:
+            continue  # A record without a move (-1) has no line to follow
+        # Follow the book's own choice so that its lines never run out of book early
+        child = position.apply_move(move)
+        if child.must_pass():
+            child = child.pass_turn()
+        child_key = canonical(child.own, child.opp)[:2]
+        ply = first_ply.get(key, plies) + 1
+        if ply < plies and child_key not in queued:
+            queued.add(child_key)
+            first_ply[child_key] = ply
+            todo.append(child_key)
+        if done % 100 == 0:
+            print(f"searched {done} positions, {len(todo)} to go", file=log)
+    return [(own, opp, *record) for (own, opp), record in records.items()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--out', default=BOOK_PATH, help="book file to create or grow")
+    parser.add_argument('--self-play', type=int, default=0, metavar='GAMES', help="number of self-play games")
+    parser.add_argument('--import', dest='imports', action='append', default=[], metavar='FILE',
+                        help="transcript file, WTHOR database or game file to take games from (repeatable)")
+    parser.add_argument('--plies', type=int, default=12, help="moves from the start of each game to add")
+    parser.add_argument('--depth', type=int, default=6, help="search depth for each book position")
+    parser.add_argument('--min-games', type=int, default=1, help="skip positions seen in fewer games")
+    parser.add_argument('--randomness', type=float, default=0.3, help="chance of a random self-play move")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for self-play")
+    args = parser.parse_args(argv)
+
+    counts = Counter()
+    first_ply = {}  # Earliest ply at which each canonical position was seen
+    collect_transcripts(args.imports, args.plies, counts, first_ply)
+    collect_self_play(args.self_play, args.plies, args.randomness, random.Random(args.seed), counts, first_ply)
+    book = load_book(args.out)
+    existing = list(book.records()) if book is not None else []
+    if book is not None:
+        book.close()
+    records = build(counts, first_ply, args.plies, args.depth, existing, args.min_games)
+    write_book(args.out, records)
+    print(f"{args.out}: {len(records)} positions")
+
+
+if __name__ == '__main__':
+    main()
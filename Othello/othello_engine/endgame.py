@@ -0,0 +1,163 @@
+"""Exact endgame solver: searches to the end of the game and returns the final disc margin."""
+
+import time
+from typing import NamedTuple, Optional
+
+from .bitboard import count, flips, iter_squares, legal_moves
+from .limits import INFINITY, Stoppable
+
+DEFAULT_ENDGAME_EMPTIES = 12  # Solve exactly once this many empty squares or fewer are left
+FASTEST_FIRST_EMPTIES = 6  # Above this many empties, moves leaving the opponent fewest replies go first
+CLOCK_CHECK_NODES = 255  # Check the clock and stop event every 256 nodes
+
+# The four 4x4 quadrants of the board, used for parity ordering
+QUADRANTS = (
+    0x000000000F0F0F0F,  # Top left
+    0x00000000F0F0F0F0,  # Top right
+    0x0F0F0F0F00000000,  # Bottom left
+    0xF0F0F0F000000000,  # Bottom right
+)
+
+
+class EndgameResult(NamedTuple):
+    """Exact solution of a position: the best square (None when there is no move), the final
+    disc margin for the side to move with perfect play and the number of nodes searched."""
+
+    move: Optional[int]
+    margin: int
+    nodes: int
+
+
+class EndgameSolver(Stoppable):
+    """Alpha-beta search to the end of the game with endgame-specific move ordering.
+
+    Odd-parity regions are tried first, moves leaving the opponent the fewest replies go first
+    while many squares are empty, and the last one and two empty squares are handled without
+    generating moves.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+
+    def solve(self, position, time_limit=None, stop_event=None):
+        """Solve ``position`` exactly and return an EndgameResult.
+
+        Raises SearchTimeout if ``time_limit`` seconds pass or ``stop_event`` is set first.
+        """
+        self.nodes = 0
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        self.stop_event = stop_event
+        own, opp = position.own, position.opp
+        empties = ~(own | opp) & 0xFFFFFFFFFFFFFFFF
+        try:
+            moves = legal_moves(own, opp)
+            if not moves:
+                margin = self.negamax(own, opp, -INFINITY, INFINITY, empties)
+                return EndgameResult(None, margin, self.nodes)
+            best_move = None
+            alpha = -INFINITY
+            for sq in self.order(own, opp, moves, empties):
+                flipped = flips(own, opp, sq)
+                score = -self.negamax(opp & ~flipped, own | flipped | (1 << sq), -INFINITY, -alpha,
+                                      empties & ~(1 << sq))
+                if score > alpha:
+                    alpha = score
+                    best_move = sq
+            return EndgameResult(best_move, alpha, self.nodes)
+        finally:
+            self.deadline = None
+            self.stop_event = None
+
+    def order(self, own, opp, moves, empties):
+        """Return the moves in the order they should be searched."""
+        # Squares in quadrants with an odd number of empties go first
+        odd = 0
+        for quadrant in QUADRANTS:
+            if count(empties & quadrant) & 1:
+                odd |= quadrant
+        if count(empties) <= FASTEST_FIRST_EMPTIES:
+            return list(iter_squares(moves & odd)) + list(iter_squares(moves & ~odd))
+
+        def replies(sq):
+            flipped = flips(own, opp, sq)
+            mobility = count(legal_moves(opp & ~flipped, own | flipped | (1 << sq)))
+            return mobility * 2 - ((odd >> sq) & 1)  # Fewest replies first, odd regions breaking ties
+
+        return sorted(iter_squares(moves), key=replies)
+
+    def negamax(self, own, opp, alpha, beta, empties):
+        """Return the exact final margin for ``own`` to move, within the (alpha, beta) window."""
+        self.nodes += 1
+        if not self.nodes & CLOCK_CHECK_NODES:
+            self.check_stop()
+        n_empties = count(empties)
+        if n_empties == 1:
+            return self.last_one(own, opp, empties)
+        if n_empties == 2:
+            return self.last_two(own, opp, alpha, beta, empties)
+
+        moves = legal_moves(own, opp)
+        if not moves:
+            if not legal_moves(opp, own):
+                return count(own) - count(opp)  # Neither side can move: the game is over
+            return -self.negamax(opp, own, -beta, -alpha, empties)  # Pass
+
+        best = -INFINITY
+        for sq in self.order(own, opp, moves, empties):
+            flipped = flips(own, opp, sq)
+            score = -self.negamax(opp & ~flipped, own | flipped | (1 << sq), -beta, -alpha, empties & ~(1 << sq))
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
+
+    def last_one(self, own, opp, empties):
+        """Final margin when a single empty square is left, with ``own`` to move."""
+        sq = empties.bit_length() - 1
+        flipped = flips(own, opp, sq)
+        if flipped:
+            return 2 * (count(own) + count(flipped) + 1) - 64  # We fill the board
+        flipped = flips(opp, own, sq)
+        if flipped:
+            return 64 - 2 * (count(opp) + count(flipped) + 1)  # We pass and the opponent fills the board
+        return count(own) - count(opp)  # Nobody can play the last square
+
+    def last_two(self, own, opp, alpha, beta, empties):
+        """Final margin when two empty squares are left, with ``own`` to move."""
+        low = empties & -empties
+        squares = (low.bit_length() - 1, (empties ^ low).bit_length() - 1)
+        best = -INFINITY
+        for sq in squares:
+            flipped = flips(own, opp, sq)
+            if flipped:
+                self.nodes += 1
+                score = -self.last_one(opp & ~flipped, own | flipped | (1 << sq), empties & ~(1 << sq))
+                if score > best:
+                    best = score
+                    if score >= beta:
+                        return best
+        if best > -INFINITY:
+            return best
+
+        # We have to pass: the opponent picks from the same two squares
+        best = INFINITY
+        for sq in squares:
+            flipped = flips(opp, own, sq)
+            if flipped:
+                self.nodes += 1
+                score = self.last_one(own & ~flipped, opp | flipped | (1 << sq), empties & ~(1 << sq))
+                if score < best:
+                    best = score
+                    if score <= alpha:
+                        return best
+        if best < INFINITY:
+            return best
+        return count(own) - count(opp)  # Neither side can play either square
+
+
+def solve(position, time_limit=None, stop_event=None):
+    """Solve ``position`` exactly with a new EndgameSolver and return an EndgameResult."""
+    return EndgameSolver().solve(position, time_limit, stop_event)
@@ -0,0 +1,24 @@
+"""Static evaluation of Othello positions.
+
+An evaluator is any callable taking the (own, opp) bitboards of the side to move and returning
+an int score for that side. ``evaluate`` is the default, table-driven PatternEvaluator.
+"""
+
+from .bitboard import count
+from .patterns import PatternEvaluator
+
+FINAL_WEIGHT = 1 << 12  # Finished games score their disc margin times this, above any evaluation
+
+
+def disc_difference(own, opp):
+    """Score a position for the player owning ``own``: the difference in disc counts."""
+    return count(own) - count(opp)
+
+
+def final_score(own, opp):
+    """Score a finished game for the player owning ``own``, so that any win beats any evaluation."""
+    return (count(own) - count(opp)) * FINAL_WEIGHT
+
+
+evaluate = PatternEvaluator()
+evaluate_batch = evaluate.evaluate_batch
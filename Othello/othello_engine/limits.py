@@ -0,0 +1,23 @@
+"""Time budgets and cancellation shared by the searches."""
+
+import time
+
+INFINITY = 1 << 24  # Larger than any score; kept an int so scores fit in the transposition table
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when the time budget runs out or the search is cancelled."""
+
+
+class Stoppable:
+    """Mixin for searches that can be stopped by a deadline or by an event set from another thread."""
+
+    deadline = None  # perf_counter() value at which the current search must stop
+    stop_event = None  # Event that cancels the current search when set
+
+    def check_stop(self):
+        """Raise SearchTimeout if the time budget is spent or the search has been cancelled."""
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout
@@ -0,0 +1,64 @@
+"""Move ordering heuristics shared by the searches."""
+
+from .bitboard import BOARD_SIZE
+from .transposition import NO_MOVE
+
+# Static value of each square as a move: corners are best, the squares next to them worst
+_QUADRANT = (
+    (100, -20, 10, 5),
+    (-20, -50, -2, -2),
+    (10, -2, 1, 1),
+    (5, -2, 1, 0),
+)
+
+
+def _prior(sq):
+    row, col = divmod(sq, BOARD_SIZE)
+    return _QUADRANT[min(row, 7 - row)][min(col, 7 - col)]
+
+
+SQUARE_PRIORS = tuple(_prior(sq) for sq in range(64))
+MAX_PLY = 64  # Deepest ply killers are kept for; a game never has more moves than squares
+
+
+class MoveOrderer:
+    """Killer and history tables used to try the most promising moves first.
+
+    History scores start at the square priors, grow by ``depth * depth`` every time a move
+    causes a cutoff and are halved between searches so old results fade out.
+    """
+
+    def __init__(self):
+        self.history = [prior * 16 for prior in SQUARE_PRIORS]
+        self.killers = [[NO_MOVE, NO_MOVE] for _ in range(MAX_PLY)]  # Two most recent cutoff moves per ply
+
+    def new_search(self):
+        """Age the history table and forget the killers of the previous search."""
+        self.history = [score // 2 for score in self.history]
+        for killers in self.killers:
+            killers[0] = killers[1] = NO_MOVE
+
+    def order(self, squares, ply, first=NO_MOVE):
+        """Return ``squares`` sorted best first: ``first`` (e.g. the hash move), killers, then history."""
+        history = self.history
+        killer_a, killer_b = self.killers[ply]
+        bonus = 1 << 30  # Larger than any history score
+
+        def key(sq):
+            if sq == first:
+                return 3 * bonus
+            if sq == killer_a:
+                return 2 * bonus
+            if sq == killer_b:
+                return bonus
+            return history[sq]
+
+        return sorted(squares, key=key, reverse=True)
+
+    def record_cutoff(self, sq, ply, depth):
+        """Remember that ``sq`` caused a beta cutoff at ``ply`` with ``depth`` plies left."""
+        self.history[sq] += depth * depth
+        killers = self.killers[ply]
+        if killers[0] != sq:
+            killers[1] = killers[0]
+            killers[0] = sq
@@ -0,0 +1,194 @@
+"""Root-split parallel search that spreads the root moves over a pool of processes.
+
+Each iteration of the iterative deepening searches the first (best so far) root move on its own,
+then hands the remaining root moves to the pool at the same time. Workers share the best root
+score found so far through a ``multiprocessing.Value``, so a move started after a good one has
+been found is searched with a narrower window. Every worker process keeps its own Searcher, and
+therefore its own transposition table, between tasks.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .bitboard import flips
+from .endgame import DEFAULT_ENDGAME_EMPTIES
+from .evaluate import evaluate
+from .position import Position
+from .limits import INFINITY, SearchTimeout
+from .search import SearchResult, Searcher, search_depth
+from .transposition import DEFAULT_SIZE_MB, TranspositionTable
+from .zobrist import colour_index, position_key, update_key
+
+WAIT_INTERVAL = 0.01  # Seconds between checks of the clock and the stop event while waiting for workers
+
+# Per-process state of a worker, set up by _init_worker
+_searcher = None
+_shared_alpha = None
+_stop_flag = None
+
+
+def _init_worker(evaluator, tt_size_mb, shared_alpha, stop_flag):
+    """Create the Searcher used by this worker process for all of its tasks."""
+    global _searcher, _shared_alpha, _stop_flag
+    _searcher = Searcher(evaluator, TranspositionTable(tt_size_mb), endgame_empties=0)
+    _shared_alpha = shared_alpha
+    _stop_flag = stop_flag
+
+
+def _search_root_move(black, white, player, sq, depth, wall_deadline):
+    """Search root move ``sq`` to ``depth`` plies and return (sq, score, nodes).
+
+    The score is None when the search ran out of time or was stopped. Scores below the shared
+    alpha are only upper bounds, but any score at or above it is exact.
+    """
+    position = Position(black, white, player)
+    own, opp = position.own, position.opp
+    searcher = _searcher
+    searcher.nodes = 0
+    if wall_deadline is not None:
+        # time.time() is shared by all processes; perf_counter() is what the Searcher checks
+        searcher.deadline = time.perf_counter() + (wall_deadline - time.time())
+    searcher.stop_event = _stop_flag
+    alpha = _shared_alpha.value
+    flipped = flips(own, opp, sq)
+    key = update_key(position_key(position), colour_index(player), sq, flipped)
+    try:
+        score = -searcher.alpha_beta(opp & ~flipped, own | flipped | (1 << sq), -INFINITY, -(alpha - 1),
+                                     depth - 1, key, colour_index(player) ^ 1, 1)
+    except SearchTimeout:
+        return sq, None, searcher.nodes
+    finally:
+        searcher.deadline = None
+        searcher.stop_event = None
+    with _shared_alpha.get_lock():
+        if score > _shared_alpha.value:
+            _shared_alpha.value = score
+    return sq, score, searcher.nodes
+
+
+class ParallelSearcher:
+    """Iterative-deepening search with the root moves split across ``workers`` processes.
+
+    It offers the same ``search`` method as Searcher. With ``workers=1``, for book positions and for
+    endgame positions the exact solver handles, the search runs in the calling process with a plain Searcher, so its
+    results are deterministic. The process pool is
+    started on the first search and kept until ``close`` is called; the class is also a context
+    manager.
+    """
+
+    def __init__(self, workers=None, evaluator=evaluate, tt_size_mb=DEFAULT_SIZE_MB,
+                 endgame_empties=DEFAULT_ENDGAME_EMPTIES, book=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.evaluator = evaluator
+        self.tt_size_mb = tt_size_mb
+        self.endgame_empties = endgame_empties
+        self.nodes = 0
+        self.executor = None
+        self.local = Searcher(evaluator, TranspositionTable(tt_size_mb), endgame_empties, book)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut the worker processes down."""
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def start(self):
+        """Start the worker processes if they are not running yet."""
+        if self.executor is None:
+            self.shared_alpha = multiprocessing.Value('q', -INFINITY)
+            self.stop_flag = multiprocessing.Event()
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                initargs=(self.evaluator, self.tt_size_mb,
+                                                          self.shared_alpha, self.stop_flag))
+
+    def search(self, position, depth=None, time_limit=None, on_iteration=None, stop_event=None):
+        """Search ``position`` by iterative deepening and return a SearchResult.
+
+        The arguments mean the same as for Searcher.search.
+        """
+        depth = search_depth(depth, time_limit)
+        if (self.workers == 1 or position.empties <= self.endgame_empties
+                or self.local.book_move(position) is not None):
+            return self.local.search(position, depth, time_limit, on_iteration, stop_event)
+
+        start = time.perf_counter()
+        wall_deadline = time.time() + time_limit if time_limit is not None else None
+        self.nodes = 0
+        root_moves = position.legal_moves()
+        if len(root_moves) <= 1:
+            return self.local.search(position, 1)  # Nothing to choose between
+
+        self.start()
+        result = None
+        for iteration in range(1, min(depth, position.empties) + 1):
+            if result is not None and time_limit is not None and time.perf_counter() - start > time_limit / 2:
+                break  # The next iteration would very likely not finish in time
+            scores = self.search_iteration(position, iteration, root_moves, wall_deadline, stop_event)
+            if scores is None:
+                break  # Out of time or stopped: keep the last completed iteration
+            root_moves.sort(key=scores.__getitem__, reverse=True)  # Stable: ties keep the earlier move first
+            result = SearchResult(root_moves[0], scores[root_moves[0]], iteration, self.nodes)
+            if on_iteration is not None:
+                on_iteration(result)
+        if result is None:
+            # Not even depth 1 finished: fall back on a one-ply search in this process
+            result = self.local.search(position, 1)
+        return SearchResult(result.move, result.score, result.depth, self.nodes)
+
+    def search_iteration(self, position, depth, root_moves, wall_deadline, stop_event):
+        """Search every root move to ``depth`` and return {move: score}, or None if interrupted."""
+        self.shared_alpha.value = -INFINITY
+        args = (position.black, position.white, position.player)
+        # The best move so far goes first and alone, so the others start with its score as alpha
+        first = self.executor.submit(_search_root_move, *args, root_moves[0], depth, wall_deadline)
+        scores = self.collect([first], wall_deadline, stop_event)
+        if scores is None:
+            return None
+        pending = [self.executor.submit(_search_root_move, *args, sq, depth, wall_deadline)
+                   for sq in root_moves[1:]]
+        rest = self.collect(pending, wall_deadline, stop_event)
+        if rest is None:
+            return None
+        scores.update(rest)
+        return scores
+
+    def collect(self, futures, wall_deadline, stop_event):
+        """Wait for ``futures`` and return {move: score}, or None if any of them was interrupted."""
+        scores = {}
+        pending = set(futures)
+        interrupted = False
+        while pending:
+            done, pending = wait(pending, timeout=WAIT_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                sq, score, nodes = future.result()
+                self.nodes += nodes
+                if score is None:
+                    interrupted = True
+                scores[sq] = score
+            if (interrupted or (wall_deadline is not None and time.time() > wall_deadline)
+                    or (stop_event is not None and stop_event.is_set())):
+                interrupted = True
+                self.stop_flag.set()  # Tell the remaining workers to give up
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                for future in pending:
+                    if not future.cancelled():
+                        self.nodes += future.result()[2]
+                self.stop_flag.clear()
+                break
+        return None if interrupted else scores
+
+
+def parallel_search(position, depth=None, time_limit=None, workers=None, evaluator=evaluate):
+    """Search ``position`` with a temporary ParallelSearcher and return a SearchResult."""
+    with ParallelSearcher(workers, evaluator) as searcher:
+        return searcher.search(position, depth, time_limit)
@@ -0,0 +1,243 @@
+"""Table-driven pattern evaluation.
+
+The four edges and the two long diagonals of the board are each read as a line of eight
+squares. Each line is encoded as a base-3 index (0 empty, 1 own disc, 2 opponent disc) into a
+precomputed table of 3**8 scores. The edge table rewards corners, edge stability and good edge
+squares. The diagonal table punishes X-squares next to empty corners. Mobility is added on top.
+
+The tables are stored in a small binary file (``data/patterns.bin``) of little-endian int16
+values and memory-mapped with the ``mmap`` module when loaded. When NumPy is installed the same
+mapping is also viewed as NumPy arrays, without copying, and ``PatternEvaluator.evaluate_batch``
+scores many positions in one vectorized call. The file is rebuilt by ``write_tables`` whenever
+it is missing.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .bitboard import DIRECTIONS, FULL, legal_moves
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional: tables are then read through mmap and batches scored one by one
+    np = None
+
+TABLE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'patterns.bin')
+MAGIC = b'OTPT'  # File signature
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')  # Magic, version, number of tables, entries per table
+LINE_ENTRIES = 3 ** 8  # Entries in the table of one 8-square line
+
+MOBILITY_WEIGHT = 8  # Score per legal move more than the opponent
+
+# Weights used to build the tables, per square along a line (index 0 and 7 are corners)
+CORNER = 40  # Counted by both edges through the corner
+EDGE_WEIGHTS = (CORNER, 0, 5, 2, 2, 5, 0, CORNER)
+C_SQUARE = -20  # An edge square next to an empty corner
+STABLE_EDGE = 10  # Bonus for each edge disc that can never be flipped along the edge
+DIAGONAL_WEIGHTS = (0, 0, 2, 1, 1, 2, 0, 0)  # Corners are already scored by the edges
+X_SQUARE = -40  # A diagonal square next to an empty corner
+
+# Masks and multipliers that gather the squares of a line into the low 8 bits of an integer
+COLUMN = 0x0101010101010101  # Column 0
+COLUMN_MAGIC = 0x0102040810204080
+DIAGONAL = 0x8040201008040201  # a1-h8
+ANTI_DIAGONAL = 0x0102040810204080  # h1-a8
+DIAGONAL_MAGIC = 0x0101010101010101
+
+# BINARY_TO_TERNARY[b] reads the bits of byte b as base-3 digits, so a line with own discs on
+# the bits of o and opponent discs on the bits of p has index BINARY_TO_TERNARY[o] + 2 * BINARY_TO_TERNARY[p]
+BINARY_TO_TERNARY = tuple(sum(3 ** i for i in range(8) if b >> i & 1) for b in range(256))
+
+if np is not None:
+    _BINARY_TO_TERNARY_ARRAY = np.array(BINARY_TO_TERNARY, dtype=np.intp)
+    _POPCOUNT_BYTE = np.array([bin(b).count('1') for b in range(256)], dtype=np.int32)
+
+
+def _digits(index):
+    """Decode a line index into its eight base-3 digits."""
+    digits = []
+    for _ in range(8):
+        index, digit = divmod(index, 3)
+        digits.append(digit)
+    return digits
+
+
+def _stable(digits):
+    """Return the positions on a line whose discs can never be flipped along that line."""
+    if 0 not in digits:
+        return set(range(8))  # A full line can no longer change
+    stable = set()
+    for ends in (range(8), range(7, -1, -1)):
+        ends = list(ends)
+        colour = digits[ends[0]]
+        if colour == 0:
+            continue
+        for i in ends:  # A run of one colour anchored in a corner is stable
+            if digits[i] != colour:
+                break
+            stable.add(i)
+    return stable
+
+
+def _edge_score(digits):
+    """Score one edge configuration for the side whose discs are digit 1."""
+    sign = (0, 1, -1)
+    score = 0
+    stable = _stable(digits)
+    for i, digit in enumerate(digits):
+        if digit:
+            score += sign[digit] * EDGE_WEIGHTS[i]
+            if i in stable:
+                score += sign[digit] * STABLE_EDGE
+    for corner, c_square in ((0, 1), (7, 6)):
+        if digits[c_square] and not digits[corner]:
+            score += sign[digits[c_square]] * C_SQUARE
+    return score
+
+
+def _diagonal_score(digits):
+    """Score one diagonal configuration for the side whose discs are digit 1."""
+    sign = (0, 1, -1)
+    score = sum(sign[digit] * DIAGONAL_WEIGHTS[i] for i, digit in enumerate(digits))
+    for corner, x_square in ((0, 1), (7, 6)):
+        if digits[x_square] and not digits[corner]:
+            score += sign[digits[x_square]] * X_SQUARE
+    return score
+
+
+def build_tables():
+    """Compute the (edge, diagonal) score tables from the weights above."""
+    edge = [_edge_score(_digits(index)) for index in range(LINE_ENTRIES)]
+    diagonal = [_diagonal_score(_digits(index)) for index in range(LINE_ENTRIES)]
+    return edge, diagonal
+
+
+def write_tables(path=TABLE_PATH):
+    """Build the tables and save them to ``path``."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    values = array('h')
+    for table in build_tables():
+        values.extend(table)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 2, LINE_ENTRIES))
+        f.write(values.tobytes())
+
+
+def load_tables(path=TABLE_PATH):
+    """Memory-map the tables in ``path`` and return them as (edge, diagonal) sequences of ints."""
+    with open(path, 'rb') as f:
+        magic, version, tables, entries = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or tables != 2 or entries != LINE_ENTRIES:
+            raise ValueError(f"{path} is not a version {VERSION} pattern table file")
+        if sys.byteorder == 'little':
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            values = memoryview(mapped)[HEADER.size:].cast('h')
+        else:
+            values = array('h', f.read())  # Big-endian machines cannot map the file directly
+            values.byteswap()
+    return values[:entries], values[entries:]
+
+
+class PatternEvaluator:
+    """Evaluation function scoring (own, opp) bitboards for the side to move with table lookups."""
+
+    def __init__(self, path=TABLE_PATH):
+        self.path = path
+        if not os.path.exists(path):
+            write_tables(path)
+        self.edge, self.diagonal = load_tables(path)
+        if np is not None:
+            # Zero-copy NumPy views of the mapped tables for batch scoring
+            self.edge_array = np.asarray(self.edge)
+            self.diagonal_array = np.asarray(self.diagonal)
+
+    def __reduce__(self):
+        # Memory maps cannot be pickled, so worker processes map the file again themselves
+        return PatternEvaluator, (self.path,)
+
+    def line_score(self, own, opp):
+        """Sum the edge and diagonal table scores of a position."""
+        b2t = BINARY_TO_TERNARY
+        edge = self.edge
+        score = edge[b2t[own & 0xFF] + 2 * b2t[opp & 0xFF]]  # Top edge
+        score += edge[b2t[own >> 56] + 2 * b2t[opp >> 56]]  # Bottom edge
+        score += edge[b2t[((own & COLUMN) * COLUMN_MAGIC & FULL) >> 56]
+                      + 2 * b2t[((opp & COLUMN) * COLUMN_MAGIC & FULL) >> 56]]  # Left edge
+        score += edge[b2t[((own >> 7 & COLUMN) * COLUMN_MAGIC & FULL) >> 56]
+                      + 2 * b2t[((opp >> 7 & COLUMN) * COLUMN_MAGIC & FULL) >> 56]]  # Right edge
+        diagonal = self.diagonal
+        score += diagonal[b2t[((own & DIAGONAL) * DIAGONAL_MAGIC & FULL) >> 56]
+                          + 2 * b2t[((opp & DIAGONAL) * DIAGONAL_MAGIC & FULL) >> 56]]
+        score += diagonal[b2t[((own & ANTI_DIAGONAL) * DIAGONAL_MAGIC & FULL) >> 56]
+                          + 2 * b2t[((opp & ANTI_DIAGONAL) * DIAGONAL_MAGIC & FULL) >> 56]]
+        return score
+
+    def __call__(self, own, opp):
+        """Score a position for the player owning ``own``."""
+        mobility = legal_moves(own, opp).bit_count() - legal_moves(opp, own).bit_count()
+        return self.line_score(own, opp) + MOBILITY_WEIGHT * mobility
+
+    def evaluate_batch(self, positions):
+        """Score a sequence of (own, opp) pairs and return the scores.
+
+        With NumPy the whole batch is scored in one vectorized pass and an int32 array is
+        returned; otherwise this falls back on a list of single evaluations.
+        """
+        if np is None:
+            return [self(own, opp) for own, opp in positions]
+        if not len(positions):
+            return np.zeros(0, dtype=np.int32)
+        pairs = np.array(positions, dtype=np.uint64).reshape(-1, 2)
+        own, opp = pairs[:, 0], pairs[:, 1]
+        edge, diagonal = self.edge_array, self.diagonal_array
+        b2t = _BINARY_TO_TERNARY_ARRAY
+
+        def line(bits_own, bits_opp):
+            return b2t[bits_own.astype(np.intp)] + 2 * b2t[bits_opp.astype(np.intp)]
+
+        def gather(x, mask, magic, shift=0):
+            # uint64 multiplication wraps around, which is exactly the & FULL of the scalar code
+            return ((x >> np.uint64(shift)) & np.uint64(mask)) * np.uint64(magic) >> np.uint64(56)
+
+        low = np.uint64(0xFF)
+        score = edge[line(own & low, opp & low)].astype(np.int32)
+        score += edge[line(own >> np.uint64(56), opp >> np.uint64(56))]
+        score += edge[line(gather(own, COLUMN, COLUMN_MAGIC), gather(opp, COLUMN, COLUMN_MAGIC))]
+        score += edge[line(gather(own, COLUMN, COLUMN_MAGIC, 7), gather(opp, COLUMN, COLUMN_MAGIC, 7))]
+        score += diagonal[line(gather(own, DIAGONAL, DIAGONAL_MAGIC), gather(opp, DIAGONAL, DIAGONAL_MAGIC))]
+        score += diagonal[line(gather(own, ANTI_DIAGONAL, DIAGONAL_MAGIC),
+                               gather(opp, ANTI_DIAGONAL, DIAGONAL_MAGIC))]
+        mobility = _popcount(_legal_moves_array(own, opp)) - _popcount(_legal_moves_array(opp, own))
+        return (score + MOBILITY_WEIGHT * mobility).astype(np.int32)  # Summing the popcounts widens to int64
+
+
+def _legal_moves_array(own, opp):
+    """Vectorized bitboard.legal_moves over uint64 arrays."""
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for shift, mask in DIRECTIONS:
+        mask = np.uint64(mask)
+        if shift > 0:
+            step = np.uint64(shift)
+            x = (own << step) & mask & opp
+            for _ in range(5):
+                x |= (x << step) & mask & opp
+            moves |= (x << step) & mask & empty
+        else:
+            step = np.uint64(-shift)
+            x = (own >> step) & mask & opp
+            for _ in range(5):
+                x |= (x >> step) & mask & opp
+            moves |= (x >> step) & mask & empty
+    return moves
+
+
+def _popcount(bits):
+    """Number of set bits in each element of a uint64 array."""
+    return _POPCOUNT_BYTE[bits.view(np.uint8).reshape(-1, 8)].sum(axis=1)
@@ -0,0 +1,109 @@
+"""Immutable Othello positions built on top of the bitboard rules."""
+
+from typing import NamedTuple
+
+from . import bitboard
+from .bitboard import START_BLACK, START_WHITE, count, iter_squares, play
+
+
+def opponent_of(player):
+    """Return the colour that moves after ``player`` ('B' or 'W')."""
+    return 'W' if player == 'B' else 'B'
+
+
+class Position(NamedTuple):
+    """A board position: one bitboard per colour and the colour to move ('B' or 'W')."""
+
+    black: int
+    white: int
+    player: str = 'B'
+
+    @classmethod
+    def initial(cls):
+        """Return the standard starting position with Black to move."""
+        return cls(START_BLACK, START_WHITE, 'B')
+
+    @classmethod
+    def from_rows(cls, board, player='B'):
+        """Build a position from a list-of-lists board of 'B', 'W' and ' '."""
+        black, white = bitboard.from_rows(board)
+        return cls(black, white, player)
+
+    @property
+    def own(self):
+        """Bitboard of the discs belonging to the player to move."""
+        return self.black if self.player == 'B' else self.white
+
+    @property
+    def opp(self):
+        """Bitboard of the discs belonging to the player waiting to move."""
+        return self.white if self.player == 'B' else self.black
+
+    @property
+    def empties(self):
+        """Number of empty squares left on the board."""
+        return 64 - count(self.black | self.white)
+
+    def move_mask(self):
+        """Return the bitmask of legal moves for the player to move."""
+        return bitboard.legal_moves(self.own, self.opp)
+
+    def legal_moves(self):
+        """Return the legal moves for the player to move as a list of square indexes."""
+        return list(iter_squares(self.move_mask()))
+
+    def is_legal(self, sq):
+        """Return True if the player to move may play on square ``sq``."""
+        return 0 <= sq < 64 and bool(self.move_mask() & (1 << sq))
+
+    def apply_move(self, sq):
+        """Return the position after the player to move plays on ``sq``.
+
+        ``sq`` must be a legal move; pass with ``pass_turn`` instead when there is none.
+        """
+        own, opp = play(self.own, self.opp, sq)
+        if self.player == 'B':
+            return Position(own, opp, 'W')
+        return Position(opp, own, 'B')
+
+    def pass_turn(self):
+        """Return the same board with the other colour to move."""
+        return Position(self.black, self.white, opponent_of(self.player))
+
+    def must_pass(self):
+        """Return True if the player to move has no move but the opponent does."""
+        return not self.move_mask() and bool(bitboard.legal_moves(self.opp, self.own))
+
+    def is_game_over(self):
+        """Return True if neither colour has a legal move."""
+        return (not bitboard.legal_moves(self.black, self.white)
+                and not bitboard.legal_moves(self.white, self.black))
+
+    def counts(self):
+        """Return the (black, white) disc counts."""
+        return count(self.black), count(self.white)
+
+    def winner(self):
+        """Return 'B', 'W' or None for a draw, judged on the current disc counts."""
+        black, white = self.counts()
+        if black > white:
+            return 'B'
+        if white > black:
+            return 'W'
+        return None
+
+    def to_rows(self):
+        """Return the board as a list-of-lists of 'B', 'W' and ' '."""
+        return bitboard.to_rows(self.black, self.white)
+
+
+def legal_moves(position):
+    """Return the legal moves of ``position`` as a list of square indexes."""
+    return position.legal_moves()
+
+
+def apply_move(position, move):
+    """Return the position after ``move``; a move of None passes the turn."""
+    if move is None:
+        return position.pass_turn()
+    return position.apply_move(move)
@@ -0,0 +1,453 @@
+"""Compact game records: an append-only game file with an index, and WTHOR and text import/export.
+
+Usage (from the folder containing othello_engine)::
+
+    python -m othello_engine.records import games.otg WTH_2023.wtb transcripts.txt
+    python -m othello_engine.records export games.otg games.txt
+    python -m othello_engine.records info games.otg
+
+A game file (``.otg``) starts with a short file header, followed by the games one after the
+other. Each game is a fixed header (number of moves, final disc counts, tournament and player
+numbers) and then one byte per move holding the square index; passes are implied, as in every
+Othello transcript format. Games are only ever appended. A side file (``.otg.idx``) holds the
+offset of every game as little-endian 64-bit integers, so game ``i`` is found without reading
+the games before it. The index is rebuilt from the game file whenever it is missing or does
+not match it.
+
+WTHOR databases (``.wtb``) and text files with one game per line written as concatenated moves
+(``f5d6c3...``) can be imported and exported. ``replay`` and ``GameFile.positions`` regenerate
+the positions of games one at a time, so any number of games can be streamed through in
+constant memory.
+"""
+
+import argparse
+import datetime
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import NamedTuple
+
+from .bitboard import parse_square, square_name
+from .position import Position
+
+MAGIC = b'OTGR'  # File signature
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sHxx')  # Magic, version
+GAME_HEADER = struct.Struct('<BBBHHH')  # Moves, black discs, white discs, tournament, black player, white player
+OFFSET = struct.Struct('<Q')  # One index entry
+INDEX_SUFFIX = '.idx'
+
+# WTHOR database layout: a 16-byte file header, then 68 bytes per game holding the tournament and
+# player numbers, the real and theoretical scores and 60 move bytes (10 * row + column, from 11
+# for a1 to 88 for h8, padded with zeros)
+WTHOR_HEADER = struct.Struct('<BBBBIHHBBBx')  # Century, year, month, day, games, records, year, size, type, depth
+WTHOR_GAME = struct.Struct('<HHHBB60s')  # Tournament, black player, white player, real score, theoretical score
+
+
+class GameRecord(NamedTuple):
+    """A finished or abandoned game: its moves as a bytes object of squares, and its final disc counts.
+
+    ``tournament``, ``black_player`` and ``white_player`` are the numbers used by WTHOR databases,
+    or 0 when unknown.
+    """
+
+    moves: bytes
+    black_discs: int
+    white_discs: int
+    tournament: int = 0
+    black_player: int = 0
+    white_player: int = 0
+
+    @property
+    def result(self):
+        """Final disc difference from Black's point of view."""
+        return self.black_discs - self.white_discs
+
+    def text(self):
+        """The moves as a string such as 'f5d6c3'."""
+        return ''.join(square_name(sq) for sq in self.moves)
+
+
+def replay(moves):
+    """Yield (position, move) for every move of a game, passing whenever the player to move must.
+
+    Raises ValueError at the first illegal move.
+    """
+    position = Position.initial()
+    for sq in moves:
+        legal = position.move_mask()
+        if not legal:
+            position = position.pass_turn()  # No move: pass, or the game is over and ``sq`` is illegal
+            legal = position.move_mask()
+        if not legal >> sq & 1:
+            raise ValueError(f"illegal move {square_name(sq) if 0 <= sq < 64 else sq} "
+                             f"in {''.join(square_name(m) for m in moves if 0 <= m < 64)}")
+        yield position, sq
+        position = position.apply_move(sq)
+
+
+def final_position(moves):
+    """Return the position at the end of a game; raises ValueError at the first illegal move."""
+    position = Position.initial()
+    for position, sq in replay(moves):
+        pass  # Only the position before the last move is needed
+    return position.apply_move(moves[-1]) if moves else position
+
+
+def position_after(text):
+    """Return the Position reached by a move string such as 'f5d6c3', passing if the player to move must.
+
+    Raises ValueError for an illegal or incomplete move.
+    """
+    position = final_position(parse_moves(text))
+    if position.must_pass():
+        position = position.pass_turn()
+    return position
+
+
+def make_record(moves, tournament=0, black_player=0, white_player=0):
+    """Check a game given as squares and return its GameRecord; raises ValueError if a move is illegal."""
+    moves = bytes(moves)
+    black_discs, white_discs = final_position(moves).counts()
+    return GameRecord(moves, black_discs, white_discs, tournament, black_player, white_player)
+
+
+def parse_moves(line):
+    """Return the squares of a game written as concatenated moves such as 'f5d6c3'."""
+    text = ''.join(line.split())
+    if len(text) % 2:
+        raise ValueError(f"incomplete move at the end of {text!r}")
+    return [parse_square(text[i:i + 2]) for i in range(0, len(text), 2)]
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def scan_offsets(path):
+    """Yield the offset of every game in a game file by walking through it."""
+    with open(path, 'rb') as f:
+        offset = FILE_HEADER.size
+        f.seek(offset)
+        while True:
+            header = f.read(GAME_HEADER.size)
+            if len(header) < GAME_HEADER.size:
+                return
+            moves = header[0]
+            if len(f.read(moves)) < moves:
+                return  # A game cut short by a crash while appending
+            yield offset
+            offset += GAME_HEADER.size + moves
+
+
+def rebuild_index(path):
+    """Write the index of a game file from scratch."""
+    tmp_path = index_path(path) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        for offset in scan_offsets(path):
+            f.write(OFFSET.pack(offset))
+    os.replace(tmp_path, index_path(path))
+
+
+def indexed_end(path):
+    """Return the offset just past the last game listed in the index of a game file."""
+    size = os.path.getsize(index_path(path))
+    if size < OFFSET.size:
+        return FILE_HEADER.size
+    with open(index_path(path), 'rb') as f:
+        f.seek(size - size % OFFSET.size - OFFSET.size)
+        (offset,) = OFFSET.unpack(f.read(OFFSET.size))
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        header = f.read(GAME_HEADER.size)
+    if len(header) < GAME_HEADER.size:
+        return -1  # The index points past the end of the file
+    return offset + GAME_HEADER.size + header[0]
+
+
+def index_is_current(path):
+    """Return True if the index of a game file exists and ends with the file's last game."""
+    index = index_path(path)
+    if not os.path.exists(index) or os.path.getsize(index) % OFFSET.size:
+        return False
+    return indexed_end(path) == max(os.path.getsize(path), FILE_HEADER.size)
+
+
+def check_header(f, path):
+    data = f.read(FILE_HEADER.size)
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"{path} is too short to be a game file")
+    magic, version = FILE_HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} game file")
+
+
+class GameWriter:
+    """Appends GameRecords to a game file and its index; also a context manager."""
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'wb') as f:
+                f.write(FILE_HEADER.pack(MAGIC, VERSION))
+        else:
+            with open(path, 'rb') as f:
+                check_header(f, path)
+        if not index_is_current(path):
+            rebuild_index(path)
+            end = indexed_end(path)
+            if os.path.getsize(path) > end:
+                os.truncate(path, end)  # Drop a game cut short by a crash, so new games follow the last whole one
+        self.file = open(path, 'ab')
+        self.index = open(index_path(path), 'ab')
+        self.offset = self.file.seek(0, os.SEEK_END)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, record):
+        """Append one GameRecord."""
+        self.file.write(GAME_HEADER.pack(len(record.moves), record.black_discs, record.white_discs,
+                                         record.tournament, record.black_player, record.white_player))
+        self.file.write(record.moves)
+        self.index.write(OFFSET.pack(self.offset))  # After the game, so the index never points past the file
+        self.offset += GAME_HEADER.size + len(record.moves)
+
+    def flush(self):
+        self.file.flush()
+        self.index.flush()
+
+    def close(self):
+        self.file.close()
+        self.index.close()
+
+
+class GameFile:
+    """Read-only view of a game file: ``len``, indexing, iteration and streamed positions.
+
+    The file and its index are memory-mapped, so opening a file of millions of games reads
+    neither into memory; games appended after opening are not seen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            check_header(f, path)
+        if not index_is_current(path):
+            rebuild_index(path)
+        self.size = os.path.getsize(index_path(path)) // OFFSET.size
+        self.data = self.index = None
+        if self.size:
+            with open(path, 'rb') as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(index_path(path), 'rb') as f:
+                self.index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if sys.byteorder == 'little':
+                self.index = memoryview(self.index_map).cast('Q')
+            else:
+                self.index = array('Q', self.index_map)  # Big-endian machines cannot use the mapping directly
+                self.index.byteswap()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        """Release the memory maps."""
+        if self.data is not None:
+            if isinstance(self.index, memoryview):
+                self.index.release()
+            self.index_map.close()
+            self.data.close()
+            self.data = self.index = None
+
+    def read(self, offset):
+        """Return the GameRecord stored at ``offset``."""
+        moves, black_discs, white_discs, tournament, black, white = GAME_HEADER.unpack_from(self.data, offset)
+        start = offset + GAME_HEADER.size
+        return GameRecord(self.data[start:start + moves], black_discs, white_discs, tournament, black, white)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("game index out of range")
+        return self.read(self.index[index])
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield self.read(self.index[index])
+
+    def positions(self):
+        """Yield (record, position, move) for every move of every game, one game at a time."""
+        for record in self:
+            for position, sq in replay(record.moves):
+                yield record, position, sq
+
+
+def write_games(path, records):
+    """Append GameRecords to the game file at ``path`` and return how many were written."""
+    written = 0
+    with GameWriter(path) as writer:
+        for record in records:
+            writer.append(record)
+            written += 1
+    return written
+
+
+def read_text(path, strict=False):
+    """Yield a GameRecord for every game in a text file of transcripts, one game per line.
+
+    Empty lines and lines starting with '#' are skipped, and so are games with an illegal move
+    unless ``strict`` is set, in which case they raise ValueError.
+    """
+    with open(path) as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            try:
+                yield make_record(parse_moves(line))
+            except ValueError:
+                if strict:
+                    raise
+
+
+def write_text(path, records):
+    """Write GameRecords as a text file of transcripts and return how many were written."""
+    written = 0
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(record.text() + '\n')
+            written += 1
+    return written
+
+
+def wthor_square(code):
+    """Square index of a WTHOR move byte."""
+    row, col = divmod(code, 10)
+    if not (1 <= row <= 8 and 1 <= col <= 8):
+        raise ValueError(f"invalid WTHOR move {code}")
+    return (row - 1) * 8 + col - 1
+
+
+def read_wthor(path, strict=False):
+    """Yield a GameRecord for every game of a WTHOR database; illegal games are handled as in read_text."""
+    with open(path, 'rb') as f:
+        header = f.read(WTHOR_HEADER.size)
+        if len(header) < WTHOR_HEADER.size:
+            raise ValueError(f"{path} is not a WTHOR database")
+        games, board_size = WTHOR_HEADER.unpack(header)[4], WTHOR_HEADER.unpack(header)[7]
+        if board_size not in (0, 8):
+            raise ValueError(f"{path} holds games on a {board_size}x{board_size} board")
+        for _ in range(games):
+            data = f.read(WTHOR_GAME.size)
+            if len(data) < WTHOR_GAME.size:
+                raise ValueError(f"{path} ends in the middle of a game")
+            tournament, black, white, _, _, codes = WTHOR_GAME.unpack(data)
+            try:
+                moves = [wthor_square(code) for code in codes.rstrip(b'\0')]
+                yield make_record(moves, tournament, black, white)
+            except ValueError:
+                if strict:
+                    raise
+
+
+def wthor_score(record):
+    """Black's WTHOR real score: its final disc count, with the empty squares going to the winner."""
+    if record.black_discs > record.white_discs:
+        return 64 - record.white_discs
+    if record.black_discs < record.white_discs:
+        return record.black_discs
+    return 32
+
+
+def write_wthor(path, records, year=None):
+    """Write GameRecords as a WTHOR database and return how many were written."""
+    today = datetime.date.today()
+    year = year or today.year
+    written = 0
+    with open(path, 'wb') as f:
+        f.write(bytes(WTHOR_HEADER.size))  # The game count is filled in at the end
+        for record in records:
+            codes = bytes(10 * (sq // 8 + 1) + sq % 8 + 1 for sq in record.moves)
+            score = wthor_score(record)
+            f.write(WTHOR_GAME.pack(record.tournament, record.black_player, record.white_player, score, score,
+                                    codes))
+            written += 1
+        f.seek(0)
+        f.write(WTHOR_HEADER.pack(today.year // 100, today.year % 100, today.month, today.day, written, 0, year,
+                                  8, 0, 0))
+    return written
+
+
+def read_games(path, strict=False):
+    """Yield the GameRecords of a game file, WTHOR database or transcript file, chosen by extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.otg':
+        with GameFile(path) as games:
+            yield from games
+    elif extension == '.wtb':
+        yield from read_wthor(path, strict)
+    else:
+        yield from read_text(path, strict)
+
+
+def write_games_as(path, records):
+    """Write GameRecords to ``path`` in the format given by its extension and return how many were written."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.otg':
+        return write_games(path, records)
+    if extension == '.wtb':
+        return write_wthor(path, records)
+    return write_text(path, records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    imports = commands.add_parser('import', help="append games from other files to a game file")
+    imports.add_argument('target', help="game file (.otg) to append to")
+    imports.add_argument('sources', nargs='+', help="game files, WTHOR databases (.wtb) or transcript files")
+    imports.add_argument('--strict', action='store_true', help="stop at the first illegal game")
+    exports = commands.add_parser('export', help="write the games of a game file as WTHOR or text")
+    exports.add_argument('source', help="game file (.otg)")
+    exports.add_argument('target', help="WTHOR database (.wtb), game file (.otg) or transcript file")
+    info = commands.add_parser('info', help="count the games in a game file")
+    info.add_argument('source', help="game file (.otg)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        with GameWriter(args.target) as writer:
+            for source in args.sources:
+                imported = 0
+                for record in read_games(source, args.strict):
+                    writer.append(record)
+                    imported += 1
+                print(f"{source}: {imported} games")
+    elif args.command == 'export':
+        with GameFile(args.source) as games:
+            print(f"{args.target}: {write_games_as(args.target, games)} games")
+    else:
+        with GameFile(args.source) as games:
+            moves = black_wins = white_wins = 0
+            for record in games:
+                moves += len(record.moves)
+                black_wins += record.result > 0
+                white_wins += record.result < 0
+            count = len(games)
+            print(f"{args.source}: {count} games, {moves / count if count else 0:.1f} moves per game, "
+                  f"Black won {black_wins}, White won {white_wins}, {count - black_wins - white_wins} draws")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""Alpha-beta search over bitboard positions, independent of any user interface."""
+
+import time
+from typing import NamedTuple, Optional
+
+from .bitboard import flips, iter_squares, legal_moves
+from .endgame import DEFAULT_ENDGAME_EMPTIES, EndgameSolver
+from .evaluate import FINAL_WEIGHT, evaluate, final_score
+from .limits import INFINITY, SearchTimeout, Stoppable
+from .ordering import MoveOrderer
+from .stats import InstrumentedOrderer, SearchStats
+from .transposition import EXACT, LOWER, NO_MOVE, UPPER, TranspositionTable
+from .zobrist import SIDE_KEY, colour_index, position_key, update_key
+
+MAX_DEPTH = 60  # No game lasts more plies than there are empty squares at the start
+CLOCK_CHECK_NODES = 255  # Check the clock every 256 nodes
+ENDGAME_SEARCH_SHARE = 0.25  # Share of a timed endgame move searched by iterative deepening before solving
+
+
+def search_depth(depth, time_limit):
+    """Return the depth limit of a search, MAX_DEPTH when only ``time_limit`` bounds it.
+
+    Raises ValueError when neither is given, since the search would then run to the end of the game.
+    """
+    if depth is not None:
+        return depth
+    if time_limit is None:
+        raise ValueError("give a search depth or a time limit")
+    return MAX_DEPTH
+
+
+class SearchResult(NamedTuple):
+    """Outcome of a search: the chosen square (None when there is no move), its score and effort.
+
+    ``depth`` is the depth of the last iteration that completed.
+    """
+
+    move: Optional[int]
+    score: int
+    depth: int
+    nodes: int
+
+
+class Searcher(Stoppable):
+    """Iterative-deepening negamax alpha-beta search with a transposition table.
+
+    Scores are always from the point of view of the side to move. The transposition table and the
+    history heuristic are kept between searches, so a Searcher reused for a whole game benefits
+    from earlier moves. Finished games score their disc margin times FINAL_WEIGHT. Positions with
+    ``endgame_empties`` empty squares or fewer are handed to the exact EndgameSolver. Under a time
+    limit a short iterative deepening search runs first and the solver gets the time left, so a
+    solve that does not finish still leaves the deepest iteration's move. Positions found in
+    ``book`` (an OpeningBook) are answered from the book without searching.
+
+    With ``instrument=True`` every search leaves a SearchStats in ``stats``; otherwise ``stats``
+    stays None and the search runs without any bookkeeping. A ``profiler`` (anything with
+    ``enable`` and ``disable`` methods, such as ``cProfile.Profile`` or SamplingProfiler) is
+    enabled for the duration of every search.
+    """
+
+    def __init__(self, evaluator=evaluate, tt=None, endgame_empties=DEFAULT_ENDGAME_EMPTIES, book=None,
+                 instrument=False, profiler=None):
+        self.evaluate = evaluator  # Function scoring (own, opp) bitboards for the side to move
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.orderer = InstrumentedOrderer() if instrument else MoveOrderer()
+        self.instrument = instrument
+        self.profiler = profiler
+        self.stats = None  # SearchStats of the last search when instrumented
+        self.endgame = EndgameSolver()
+        self.endgame_empties = endgame_empties
+        self.book = book
+        self.nodes = 0  # Number of positions visited by the current search
+
+    def alpha_beta(self, own, opp, alpha, beta, depth, key, colour, ply):
+        """Return the negamax score of the position with ``own`` to move, searched ``depth`` plies deep.
+
+        ``key`` is the Zobrist key of the position, ``colour`` the colour index of ``own`` and
+        ``ply`` the distance from the root.
+        """
+        self.nodes += 1
+        if not self.nodes & CLOCK_CHECK_NODES:
+            self.check_stop()
+        tt = self.tt
+        hash_move = NO_MOVE
+        slot = tt.probe(key)
+        if slot >= 0:
+            hash_move = tt.moves[slot]
+            if tt.depths[slot] >= depth:
+                score = tt.scores[slot]
+                bound = tt.bounds[slot]
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    tt.cutoffs += 1
+                    return score
+
+        moves = legal_moves(own, opp)
+        if not moves:
+            if not legal_moves(opp, own):
+                return final_score(own, opp)  # Game over: score the final disc margin
+            # The side to move has to pass, so the opponent moves on the same board
+            return -self.alpha_beta(opp, own, -beta, -alpha, depth, key ^ SIDE_KEY, colour ^ 1, ply + 1)
+        if depth == 0:
+            return self.evaluate(own, opp)
+
+        original_alpha = alpha
+        best = -INFINITY
+        best_move = NO_MOVE
+        for sq in self.orderer.order(iter_squares(moves), ply, hash_move):
+            flipped = flips(own, opp, sq)
+            score = -self.alpha_beta(opp & ~flipped, own | flipped | (1 << sq), -beta, -alpha, depth - 1,
+                                     update_key(key, colour, sq, flipped), colour ^ 1, ply + 1)
+            if score > best:
+                best = score
+                best_move = sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.orderer.record_cutoff(sq, ply, depth)
+                        break  # Cutoff: the opponent will avoid this line
+
+        if best <= original_alpha:
+            bound = UPPER
+        elif best >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        tt.store(key, depth, bound, best, best_move)
+        return best
+
+    def search_root(self, position, depth, root_moves):
+        """Search every move in ``root_moves`` to ``depth`` plies and return a SearchResult.
+
+        ``root_moves`` is reordered in place, best first, for the next iteration.
+        """
+        own, opp = position.own, position.opp
+        key = position_key(position)
+        colour = colour_index(position.player)
+        stats = self.stats
+        scores = {}
+        alpha = -INFINITY
+        for sq in root_moves:
+            if stats is not None:
+                start, nodes = time.perf_counter(), self.nodes
+            flipped = flips(own, opp, sq)
+            score = -self.alpha_beta(opp & ~flipped, own | flipped | (1 << sq), -INFINITY, -alpha, depth - 1,
+                                     update_key(key, colour, sq, flipped), colour ^ 1, 1)
+            scores[sq] = score
+            alpha = max(alpha, score)
+            if stats is not None:
+                stats.add_root_move(depth, sq, score, self.nodes - nodes, time.perf_counter() - start)
+        if stats is not None:
+            stats.add_iteration(depth, self.nodes)
+        root_moves.sort(key=scores.__getitem__, reverse=True)  # Stable: ties keep the earlier move first
+        best_move = root_moves[0]
+        return SearchResult(best_move, scores[best_move], depth, self.nodes)
+
+    def book_move(self, position):
+        """Return a SearchResult for ``position`` from the opening book, or None if it is not there."""
+        if self.book is None:
+            return None
+        entry = self.book.lookup(position)
+        if entry is None or entry.move is None or not position.is_legal(entry.move):
+            return None
+        return SearchResult(entry.move, entry.score, entry.depth, 0)
+
+    def principal_variation(self, position, length=MAX_DEPTH):
+        """Return up to ``length`` best moves from ``position`` onwards, as far as the transposition table knows them.
+
+        Passes are made silently, so the list holds squares only.
+        """
+        line = []
+        seen = set()
+        while len(line) < length:
+            if position.must_pass():
+                position = position.pass_turn()
+            key = position_key(position)
+            move = self.tt.best_move(key)
+            if move is None or key in seen or not position.is_legal(move):
+                break
+            seen.add(key)
+            line.append(move)
+            position = position.apply_move(move)
+        return line
+
+    def search(self, position, depth=None, time_limit=None, on_iteration=None, stop_event=None):
+        """Search ``position`` by iterative deepening and return a SearchResult.
+
+        Iterations go one ply deeper each time, up to ``depth`` plies, until ``time_limit`` seconds
+        have passed or ``stop_event`` (a ``threading.Event``) is set. At least one of ``depth`` and
+        ``time_limit`` must be given. The result of the last completed iteration is returned; depth 1
+        is always completed so that a move is available however short the budget. ``on_iteration``
+        is called with the SearchResult of every completed iteration.
+        """
+        depth = search_depth(depth, time_limit)
+        if self.instrument:
+            self.stats = self.orderer.stats = SearchStats(self.tt)
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            result = self.iterate(position, depth, time_limit, on_iteration, stop_event)
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+        if self.stats is not None:
+            self.stats.finish(result)
+        return result
+
+    def iterate(self, position, depth, time_limit, on_iteration, stop_event):
+        """Body of ``search``, without the instrumentation and profiling around it."""
+        start = time.perf_counter()
+        self.nodes = 0
+        self.deadline = None
+        self.stop_event = None
+        self.orderer.new_search()
+        root_moves = sorted(position.legal_moves(), key=self.orderer.history.__getitem__, reverse=True)
+        if not root_moves:
+            # No legal move: the position is scored as it stands
+            if position.is_game_over():
+                return SearchResult(None, final_score(position.own, position.opp), 0, 0)
+            return SearchResult(None, self.evaluate(position.own, position.opp), 0, 0)
+
+        booked = self.book_move(position)
+        if booked is not None:
+            if self.stats is not None:
+                self.stats.source = 'book'
+            if on_iteration is not None:
+                on_iteration(booked)
+            return booked
+
+        endgame = len(root_moves) > 1 and position.empties <= self.endgame_empties
+        if endgame and time_limit is None:
+            solved = self.solve_endgame(position, None, stop_event, on_iteration)
+            if solved is not None:
+                return solved
+
+        result = self.search_root(position, 1, root_moves)
+        if on_iteration is not None:
+            on_iteration(result)
+        if len(root_moves) == 1:
+            return result  # Only one move to play, so there is nothing to think about
+        depth = min(depth, position.empties)  # Past this depth every line has reached the end of the game
+        search_limit = time_limit
+        if endgame and time_limit is not None:
+            search_limit = time_limit * ENDGAME_SEARCH_SHARE  # The rest of the budget goes to the solver
+        if search_limit is not None:
+            self.deadline = start + search_limit
+        self.stop_event = stop_event
+        try:
+            for iteration in range(2, depth + 1):
+                if self.deadline is not None and time.perf_counter() - start > search_limit / 2:
+                    break  # The next iteration would very likely not finish in time
+                self.check_stop()
+                result = self.search_root(position, iteration, root_moves)
+                if on_iteration is not None:
+                    on_iteration(result)
+        except SearchTimeout:
+            pass  # Keep the result of the last completed iteration
+        finally:
+            self.deadline = None
+            self.stop_event = None
+
+        if endgame and time_limit is not None and result.depth < position.empties:
+            # Solved last, so a solve that runs out of time still leaves the deepest iteration to play
+            time_left = start + time_limit - time.perf_counter()
+            if time_left > 0 and not (stop_event is not None and stop_event.is_set()):
+                solved = self.solve_endgame(position, time_left, stop_event, on_iteration)
+                if solved is not None:
+                    return solved
+        return SearchResult(result.move, result.score, result.depth, self.nodes)
+
+    def solve_endgame(self, position, time_limit, stop_event, on_iteration):
+        """Solve ``position`` exactly and return a SearchResult, or None if the solver runs out of time."""
+        try:
+            solved = self.endgame.solve(position, time_limit, stop_event)
+        except SearchTimeout:
+            return None
+        finally:
+            self.nodes += self.endgame.nodes
+        result = SearchResult(solved.move, solved.margin * FINAL_WEIGHT, position.empties, self.nodes)
+        if self.stats is not None:
+            self.stats.source = 'endgame'
+        if on_iteration is not None:
+            on_iteration(result)
+        return result
+
+
+def search(position, depth=None, time_limit=None, evaluator=evaluate, tt=None, on_iteration=None,
+           stop_event=None):
+    """Search ``position`` and return the best move as a SearchResult.
+
+    The search deepens one ply at a time until it reaches ``depth`` plies or ``time_limit`` seconds;
+    at least one of the two must be given.
+    """
+    return Searcher(evaluator, tt).search(position, depth, time_limit, on_iteration, stop_event)
@@ -0,0 +1,427 @@
+"""Local engine server: one process answering search requests from many game sessions at once.
+
+Usage (from the folder containing othello_engine)::
+
+    python -m othello_engine.server --port 7474
+    python -m othello_engine.server --stdio
+
+Requests and replies are JSON objects, one per line, over a localhost TCP connection or over
+standard input and output. A request names a command, an optional ``id`` echoed in the reply, a
+position and a budget::
+
+    {"id": 1, "cmd": "bestmove", "moves": "f5d6c3", "time_ms": 200}
+    {"id": 2, "cmd": "analyze", "black": 34628173824, "white": 68853694464, "player": "B", "depth": 6}
+    {"id": 3, "cmd": "stats"}
+
+The position is either ``moves`` (the game so far as a move string) or the ``black`` and
+``white`` bitboards with ``player`` to move. ``bestmove`` replies with the move, its score, the
+depth reached and the nodes searched; ``analyze`` adds the principal variation and the search
+statistics. ``stats`` reports the server's counters and reply latencies.
+
+Searches run in a pool of worker processes, each keeping its Searcher and transposition table
+between requests. Results are also kept in one LRU cache shared by all clients and keyed by the
+canonical symmetric form of the position, so a position any client has already had searched
+deeply enough is answered at once. Each client may have only ``--max-pending`` requests in
+flight; the server stops reading from a client that has that many, so a client sending too fast
+is slowed down instead of filling the server's memory. A request with ``time_ms`` is answered
+within ``time_ms`` plus ``--sla-ms`` milliseconds, time spent queueing included: when a worker
+misses that deadline, a one-ply search made on the spot is sent instead, marked ``"late": true``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .bitboard import square_name
+from .book import load_book
+from .position import Position
+from .records import position_after
+from .search import MAX_DEPTH, SearchResult, Searcher
+from .symmetry import INVERSE_SQUARE_MAPS, SQUARE_MAPS, canonical
+from .transposition import DEFAULT_SIZE_MB, TranspositionTable
+
+DEFAULT_PORT = 7474
+DEFAULT_CACHE_ENTRIES = 100000  # Cached results, roughly 200 bytes each
+DEFAULT_MAX_PENDING = 4  # Requests a client may have in flight
+DEFAULT_SLA_MS = 100  # Extra time on top of a request's budget before a late reply is sent
+SAFETY_MS = 10  # Time kept back from a request's budget for sending the reply
+QUEUE_TOLERANCE_MS = 5  # A search that waited less than this for a worker still counts as a full-budget one
+LATENCY_SAMPLES = 1000  # Reply latencies kept for the percentiles of the stats command
+
+# Per-process state of a worker, set up by _init_worker
+_searcher = None
+_analyzer = None
+
+
+def _init_worker(tt_size_mb, use_book):
+    """Create the Searchers used by this worker process for all of its requests."""
+    global _searcher, _analyzer
+    tt = TranspositionTable(tt_size_mb)
+    book = load_book() if use_book else None
+    _searcher = Searcher(tt=tt, book=book)
+    _analyzer = Searcher(tt=tt, book=book, instrument=True)  # Shares the table, and collects statistics
+
+
+def _search_request(black, white, player, depth, wall_deadline, analyze):
+    """Search a position in a worker and return (result, principal variation, statistics, time limit).
+
+    ``wall_deadline`` is a time.time() value, so time spent waiting in the pool's queue counts; the
+    time limit returned is the one the search actually got, in seconds (None for none).
+    """
+    position = Position(black, white, player)
+    time_limit = None if wall_deadline is None else max(wall_deadline - time.time(), 0.001)
+    searcher = _analyzer if analyze else _searcher
+    result = searcher.search(position, depth, time_limit)
+    if not analyze:
+        return tuple(result), None, None, time_limit
+    line = []
+    if result.move is not None:
+        line = [result.move] + searcher.principal_variation(position.apply_move(result.move), result.depth - 1)
+    return tuple(result), line, searcher.stats.as_dict(), time_limit
+
+
+class ResultCache:
+    """Bounded LRU cache of search results shared by every client.
+
+    Results are stored under the canonical form of the position with the move in canonical
+    orientation, so all eight symmetric forms of a position share one entry.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, position, depth, time_ms):
+        """Return a cached SearchResult at least as good as a search to ``depth`` within ``time_ms``, or None."""
+        own, opp, sym = canonical(position.own, position.opp)
+        entry = self.entries.get((own, opp))
+        if entry is not None:
+            move, score, result_depth, nodes, searched_ms = entry
+            # Deep enough for the request, as long as a search or a longer one, or solved to the end
+            if (result_depth >= min(depth, position.empties)
+                    or (time_ms is not None and searched_ms is not None and searched_ms >= time_ms)):
+                self.entries.move_to_end((own, opp))
+                self.hits += 1
+                if move is not None:
+                    move = INVERSE_SQUARE_MAPS[sym][move]
+                return SearchResult(move, score, result_depth, nodes)
+        self.misses += 1
+        return None
+
+    def put(self, position, result, time_ms):
+        """Store the SearchResult of ``position``, searched with a budget of ``time_ms`` (None for none).
+
+        The budget must be the time the search really had, not the one it was asked for, or a
+        search cut short by queueing would later be served as a full one.
+        """
+        own, opp, sym = canonical(position.own, position.opp)
+        old = self.entries.get((own, opp))
+        if old is not None and old[2] > result.depth:
+            return  # Keep the deeper result
+        move = SQUARE_MAPS[sym][result.move] if result.move is not None else None
+        self.entries[own, opp] = (move, result.score, result.depth, result.nodes, time_ms)
+        self.entries.move_to_end((own, opp))
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)  # Evict the least recently used result
+
+
+def parse_position(request):
+    """Return the Position a request asks about; raises ValueError if it is missing or invalid."""
+    if 'moves' in request:
+        try:
+            return position_after(request['moves'])
+        except ValueError as error:
+            raise ValueError(f"invalid moves {request['moves']!r}: {error}") from None
+    elif 'black' in request and 'white' in request:
+        black, white = int(request['black']), int(request['white'])
+        player = request.get('player', 'B')
+        if black & white or not 0 <= black | white < 1 << 64 or player not in ('B', 'W'):
+            raise ValueError("invalid position")
+        position = Position(black, white, player)
+        return position.pass_turn() if position.must_pass() else position
+    raise ValueError("the request has neither 'moves' nor 'black' and 'white'")
+
+
+class EngineServer:
+    """Serves search requests from any number of clients with a shared worker pool and cache."""
+
+    def __init__(self, workers=None, cache_entries=DEFAULT_CACHE_ENTRIES, max_pending=DEFAULT_MAX_PENDING,
+                 sla_ms=DEFAULT_SLA_MS, tt_size_mb=DEFAULT_SIZE_MB, use_book=True):
+        self.workers = workers or os.cpu_count() or 1
+        self.worker_args = (tt_size_mb, use_book)
+        self.executor = None
+        self.start_workers()
+        self.cache = ResultCache(cache_entries)
+        self.searching = {}  # Searches under way, so identical requests from several clients share one
+        self.max_pending = max_pending
+        self.sla_ms = sla_ms
+        self.fallback = Searcher(endgame_empties=0)  # Quick one-ply answers when a worker is late
+        self.requests = self.errors = self.late = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.clients = 0
+
+    def start_workers(self):
+        """Start a new pool of worker processes, replacing a broken one."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=self.worker_args)
+
+    def close(self):
+        """Shut the worker processes down."""
+        self.executor.shutdown(cancel_futures=True)
+
+    async def handle_client(self, reader, writer):
+        """Answer the requests of one client until it disconnects."""
+        self.clients += 1
+        slots = asyncio.Semaphore(self.max_pending)
+        lock = asyncio.Lock()  # Replies of concurrent requests must not interleave
+        tasks = set()
+
+        async def answer(line):
+            try:
+                reply = await self.handle_line(line)
+                async with lock:
+                    writer.write(json.dumps(reply).encode() + b'\n')
+                    await writer.drain()  # Wait while a slow client is not reading its replies
+            except ConnectionError:
+                pass
+            finally:
+                slots.release()
+
+        try:
+            while True:
+                await slots.acquire()  # Back-pressure: stop reading until a request of this client finishes
+                line = await reader.readline()
+                if not line:
+                    slots.release()
+                    break
+                if not line.strip():
+                    slots.release()
+                    continue
+                task = asyncio.create_task(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def handle_line(self, line):
+        """Decode one request line and return the reply as a dict."""
+        start = time.perf_counter()
+        self.requests += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+            request_id = request.get('id')
+            reply = await self.handle_request(request)
+        except (ValueError, TypeError, KeyError) as error:
+            self.errors += 1
+            reply = {'error': str(error)}
+        except Exception as error:  # A worker died or failed: the client still gets an answer for this id
+            self.errors += 1
+            reply = {'error': f"search failed: {type(error).__name__}: {error}"}
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.latencies.append(elapsed_ms)
+        reply['elapsed_ms'] = round(elapsed_ms, 1)
+        if request_id is not None:
+            reply['id'] = request_id
+        return reply
+
+    async def handle_request(self, request):
+        """Answer a decoded request."""
+        command = request.get('cmd', 'bestmove')
+        if command == 'stats':
+            return self.stats()
+        if command not in ('bestmove', 'analyze'):
+            raise ValueError(f"unknown command {command!r}")
+        analyze = command == 'analyze'
+        position = parse_position(request)
+        depth = int(request.get('depth', MAX_DEPTH))
+        time_ms = request.get('time_ms')
+        if time_ms is None and depth == MAX_DEPTH:
+            raise ValueError("give a time budget 'time_ms' or a 'depth'")
+        arrival = time.time()
+
+        if not analyze:
+            cached = self.cache.get(position, depth, time_ms)
+            if cached is not None:
+                return self.reply(cached, cached=True)
+
+        key = (position.black, position.white, position.player, depth, time_ms, analyze)
+        future = self.searching.get(key)
+        if future is None:
+            wall_deadline = None
+            if time_ms is not None:
+                wall_deadline = arrival + max(float(time_ms) - SAFETY_MS, 1) / 1000
+            loop = asyncio.get_running_loop()
+            args = (position.black, position.white, position.player, depth, wall_deadline, analyze)
+            try:
+                future = loop.run_in_executor(self.executor, _search_request, *args)
+            except BrokenProcessPool:
+                self.start_workers()  # A worker died during an earlier request, which got an error reply
+                future = loop.run_in_executor(self.executor, _search_request, *args)
+            self.searching[key] = future
+
+            def store(done):
+                del self.searching[key]
+                if not done.cancelled() and done.exception() is None:
+                    result, _, _, time_limit = done.result()
+                    searched_ms = None
+                    if time_limit is not None:
+                        # The budget of a request that would get the same search time, queueing included
+                        searched_ms = time_limit * 1000 + SAFETY_MS
+                        if searched_ms >= float(time_ms) - QUEUE_TOLERANCE_MS:
+                            searched_ms = time_ms
+                    self.cache.put(position, SearchResult(*result), searched_ms)
+
+            future.add_done_callback(store)  # A late result still goes into the cache for next time
+        timeout = None if time_ms is None else max(float(time_ms) + self.sla_ms, 1) / 1000 - (time.time() - arrival)
+        done, _ = await asyncio.wait({future}, timeout=timeout)
+        if not done:
+            self.late += 1
+            return self.reply(self.fallback.search(position, 1), late=True)
+        result, line, stats, _ = future.result()
+        reply = self.reply(SearchResult(*result))
+        if analyze:
+            reply['pv'] = [square_name(sq) for sq in line]
+            reply['stats'] = stats
+        return reply
+
+    @staticmethod
+    def reply(result, cached=False, late=False):
+        reply = {
+            'move': square_name(result.move) if result.move is not None else None,
+            'score': result.score,
+            'depth': result.depth,
+            'nodes': result.nodes,
+        }
+        if cached:
+            reply['cached'] = True
+        if late:
+            reply['late'] = True
+        return reply
+
+    def stats(self):
+        """Return the server counters and the latency percentiles of the recent replies."""
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            return round(latencies[min(int(fraction * len(latencies)), len(latencies) - 1)], 1) if latencies else None
+
+        return {
+            'clients': self.clients,
+            'workers': self.workers,
+            'requests': self.requests,
+            'errors': self.errors,
+            'late': self.late,
+            'cache_entries': len(self.cache),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'latency_ms_p50': percentile(0.5),
+            'latency_ms_p95': percentile(0.95),
+            'latency_ms_max': round(latencies[-1], 1) if latencies else None,
+        }
+
+    async def serve_tcp(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Accept clients on a TCP socket until cancelled."""
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self):
+        """Answer requests read from standard input on standard output until input ends."""
+        stdio = StdioStreams(asyncio.get_running_loop())
+        await self.handle_client(stdio, stdio)
+
+
+class StdioStreams:
+    """The reader and writer methods handle_client needs, over standard input and output.
+
+    Standard input is read by a thread, since it may be a file, which the event loop cannot
+    watch. The thread reads one line ahead at most, so back-pressure still reaches the sender.
+    """
+
+    def __init__(self, loop):
+        self.lines = asyncio.Queue(maxsize=1)
+        threading.Thread(target=self.read, args=(loop,), daemon=True).start()
+
+    def read(self, loop):
+        for line in sys.stdin.buffer:
+            asyncio.run_coroutine_threadsafe(self.lines.put(line), loop).result()
+        asyncio.run_coroutine_threadsafe(self.lines.put(b''), loop).result()  # End of input
+
+    async def readline(self):
+        return await self.lines.get()
+
+    def write(self, data):
+        sys.stdout.buffer.write(data)
+
+    async def drain(self):
+        sys.stdout.buffer.flush()
+
+    def close(self):
+        sys.stdout.buffer.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--stdio', action='store_true', help="serve one client on standard input and output")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="TCP port to listen on")
+    parser.add_argument('--workers', type=int, default=None, help="search processes (default: all cores)")
+    parser.add_argument('--cache-entries', type=int, default=DEFAULT_CACHE_ENTRIES, help="results kept in the cache")
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING,
+                        help="requests a client may have in flight")
+    parser.add_argument('--sla-ms', type=float, default=DEFAULT_SLA_MS,
+                        help="milliseconds past a request's budget before a late reply is sent")
+    parser.add_argument('--tt-size', type=int, default=DEFAULT_SIZE_MB, help="transposition table MB per worker")
+    parser.add_argument('--no-book', action='store_true', help="do not answer from the opening book")
+    args = parser.parse_args(argv)
+
+    server = EngineServer(args.workers, args.cache_entries, args.max_pending, args.sla_ms, args.tt_size,
+                          not args.no_book)
+
+    async def serve():
+        main_task = asyncio.current_task()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signum, main_task.cancel)
+            except NotImplementedError:
+                pass  # No signal handlers in the event loop on Windows: Ctrl-C still works there
+        try:
+            if args.stdio:
+                await server.serve_stdio()
+            else:
+                print(f"listening on {args.host}:{args.port}", file=sys.stderr)
+                await server.serve_tcp(args.host, args.port)
+        except asyncio.CancelledError:
+            pass  # Stopped by a signal
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
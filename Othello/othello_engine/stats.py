@@ -0,0 +1,207 @@
+"""Search instrumentation: counters gathered during a search and a sampling profiler.
+
+A Searcher created with ``instrument=True`` swaps its move orderer for an InstrumentedOrderer and
+fills a SearchStats object on every search. Without it nothing in the search loop changes, so the
+instrumentation costs nothing when it is switched off.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from typing import NamedTuple
+
+from .bitboard import square_name
+from .ordering import MAX_PLY, MoveOrderer
+from .transposition import NO_MOVE
+
+
+class RootMoveStats(NamedTuple):
+    """Effort spent on one root move in one iteration."""
+
+    depth: int
+    move: int
+    score: int
+    nodes: int
+    seconds: float
+
+
+class SearchStats:
+    """Counters of one search: nodes, cutoffs per ply, iterations, root moves and TT use.
+
+    ``expanded[ply]`` counts the nodes at ``ply`` whose moves were generated and searched, and
+    ``cutoffs[ply]`` how many of them ended in a beta cutoff. ``source`` tells where the move came
+    from: ``'search'``, ``'book'`` or ``'endgame'``.
+    """
+
+    def __init__(self, tt):
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.nodes = 0
+        self.depth = 0
+        self.source = 'search'
+        self.expanded = [0] * MAX_PLY
+        self.cutoffs = [0] * MAX_PLY
+        self.iterations = []  # (depth, total nodes, seconds) of every completed iteration
+        self.root_moves = []  # RootMoveStats of every root move searched
+        self.tt = tt
+        self.tt_start = (tt.probes, tt.hits, tt.cutoffs)
+        self.tt_probes = self.tt_hits = self.tt_cutoffs = 0
+
+    def add_root_move(self, depth, move, score, nodes, seconds):
+        self.root_moves.append(RootMoveStats(depth, move, score, nodes, seconds))
+
+    def add_iteration(self, depth, nodes):
+        self.iterations.append((depth, nodes, time.perf_counter() - self.start))
+
+    def finish(self, result):
+        """Record the totals once the search has returned ``result``."""
+        self.seconds = time.perf_counter() - self.start
+        self.nodes = result.nodes
+        self.depth = result.depth
+        probes, hits, cutoffs = self.tt_start
+        self.tt_probes = self.tt.probes - probes
+        self.tt_hits = self.tt.hits - hits
+        self.tt_cutoffs = self.tt.cutoffs - cutoffs
+        self.tt = None  # Do not keep the table alive through old statistics
+
+    @property
+    def nps(self):
+        return round(self.nodes / self.seconds) if self.seconds > 0 else 0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def branching_factor(self):
+        """Nodes of the last iteration divided by nodes of the one before, or None."""
+        if len(self.iterations) < 2:
+            return None
+        nodes = [0] + [total for _, total, _ in self.iterations]
+        last, previous = nodes[-1] - nodes[-2], nodes[-2] - nodes[-3]
+        return last / previous if previous else None
+
+    def last_root_moves(self):
+        """RootMoveStats of the deepest iteration, in the order the moves were searched."""
+        if not self.root_moves:
+            return []
+        depth = self.root_moves[-1].depth
+        return [stats for stats in self.root_moves if stats.depth == depth]
+
+    def as_dict(self):
+        """Return the statistics as a JSON-compatible dict."""
+        plies = max((ply + 1 for ply, count in enumerate(self.expanded) if count), default=0)
+        return {
+            'source': self.source,
+            'nodes': self.nodes,
+            'seconds': round(self.seconds, 4),
+            'nps': self.nps,
+            'depth': self.depth,
+            'branching_factor': self.branching_factor,
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_cutoffs': self.tt_cutoffs,
+            'tt_hit_rate': self.tt_hit_rate,
+            'expanded_per_ply': self.expanded[:plies],
+            'cutoffs_per_ply': self.cutoffs[:plies],
+            'iterations': [[depth, nodes, round(seconds, 4)] for depth, nodes, seconds in self.iterations],
+            'root_moves': [[stats.depth, square_name(stats.move), stats.score, stats.nodes, round(stats.seconds, 4)]
+                           for stats in self.root_moves],
+        }
+
+    def format(self, root_moves=4, plies=6):
+        """Return a few lines of text summing the search up, for display."""
+        if self.source != 'search':
+            source = 'opening book' if self.source == 'book' else 'endgame solver'
+            return f"Move from the {source}, {self.nodes:,} nodes in {self.seconds:.2f} s"
+        lines = [f"{self.nodes:,} nodes in {self.seconds:.2f} s ({self.nps:,} nps), depth {self.depth}"]
+        tt_line = f"TT hit rate {self.tt_hit_rate:.0%}"
+        if self.branching_factor is not None:
+            tt_line = f"Branching factor {self.branching_factor:.1f}, " + tt_line
+        lines.append(tt_line)
+        cutoffs = [f"{ply}: {cutoffs}/{expanded}" for ply, (cutoffs, expanded)
+                   in enumerate(zip(self.cutoffs[1:plies + 1], self.expanded[1:plies + 1]), 1) if expanded]
+        if cutoffs:
+            lines.append("Cutoffs by ply  " + "  ".join(cutoffs))
+        slowest = sorted(self.last_root_moves(), key=lambda stats: stats.seconds, reverse=True)[:root_moves]
+        if slowest:
+            lines.append("Slowest moves  " + "  ".join(f"{square_name(stats.move)} {stats.seconds * 1000:.0f} ms"
+                                                       for stats in slowest))
+        return "\n".join(lines)
+
+
+class InstrumentedOrderer(MoveOrderer):
+    """MoveOrderer that also counts expanded nodes and beta cutoffs per ply into ``stats``."""
+
+    stats = None  # SearchStats of the running search
+
+    def order(self, squares, ply, first=NO_MOVE):
+        ordered = super().order(squares, ply, first)
+        self.stats.expanded[ply] += 1
+        return ordered
+
+    def record_cutoff(self, sq, ply, depth):
+        super().record_cutoff(sq, ply, depth)
+        self.stats.cutoffs[ply] += 1
+
+
+class SamplingProfiler:
+    """Statistical profiler with the ``enable``/``disable`` interface of ``cProfile.Profile``.
+
+    While enabled, a background thread looks at the stack of the thread that enabled it every
+    ``interval`` seconds. It counts the innermost function of each sample (``own``) and every
+    function anywhere on the stack (``total``).
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.own = Counter()
+        self.total = Counter()
+        self.samples = 0
+        self.thread = None
+
+    def enable(self):
+        if self.thread is not None:
+            return
+        self.target = threading.get_ident()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def disable(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+
+    def sample(self):
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            self.own[self.label(frame)] += 1
+            while frame is not None:
+                label = self.label(frame)
+                if label not in seen:  # Recursive functions count once per sample
+                    seen.add(label)
+                    self.total[label] += 1
+                frame = frame.f_back
+
+    @staticmethod
+    def label(frame):
+        code = frame.f_code
+        return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno}({code.co_name})"
+
+    def print_stats(self, limit=20, file=None):
+        """Print the functions seen most often, innermost and anywhere on the stack."""
+        file = file or sys.stdout
+        print(f"{self.samples} samples", file=file)
+        if not self.samples:
+            return
+        print(f"{'own':>7} {'total':>7}  function", file=file)
+        for label, own in self.own.most_common(limit):
+            print(f"{own / self.samples:7.1%} {self.total[label] / self.samples:7.1%}  {label}", file=file)
@@ -0,0 +1,67 @@
+"""The eight symmetries of the Othello board, applied to bitboards and squares.
+
+Symmetry ``sym`` (0-7) flips the board top to bottom if bit 0 is set, then mirrors it left to
+right if bit 1 is set, then transposes it about the a1-h8 diagonal if bit 2 is set.
+"""
+
+from .bitboard import FULL
+
+
+def flip_vertical(bits):
+    """Swap the top and bottom rows of a bitboard."""
+    return int.from_bytes(bits.to_bytes(8, 'little'), 'big')
+
+
+def mirror_horizontal(bits):
+    """Swap the left and right columns of a bitboard."""
+    bits = ((bits >> 1) & 0x5555555555555555) | ((bits & 0x5555555555555555) << 1)
+    bits = ((bits >> 2) & 0x3333333333333333) | ((bits & 0x3333333333333333) << 2)
+    return ((bits >> 4) & 0x0F0F0F0F0F0F0F0F) | ((bits & 0x0F0F0F0F0F0F0F0F) << 4)
+
+
+def transpose(bits):
+    """Reflect a bitboard about the a1-h8 diagonal, swapping rows and columns."""
+    t = 0x0F0F0F0F00000000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bits ^ (bits << 7))
+    bits ^= t ^ (t >> 7)
+    return bits & FULL
+
+
+def transform(bits, sym):
+    """Apply symmetry ``sym`` to a bitboard."""
+    if sym & 1:
+        bits = flip_vertical(bits)
+    if sym & 2:
+        bits = mirror_horizontal(bits)
+    if sym & 4:
+        bits = transpose(bits)
+    return bits
+
+
+def inverse(bits, sym):
+    """Undo symmetry ``sym`` on a bitboard."""
+    if sym & 4:
+        bits = transpose(bits)
+    if sym & 2:
+        bits = mirror_horizontal(bits)
+    if sym & 1:
+        bits = flip_vertical(bits)
+    return bits
+
+
+# SQUARE_MAPS[sym][sq] is where square sq goes under symmetry sym
+SQUARE_MAPS = tuple(tuple(transform(1 << sq, sym).bit_length() - 1 for sq in range(64)) for sym in range(8))
+INVERSE_SQUARE_MAPS = tuple(tuple(inverse(1 << sq, sym).bit_length() - 1 for sq in range(64)) for sym in range(8))
+
+
+def canonical(own, opp):
+    """Return (own, opp, sym): the smallest of the eight symmetric forms and the symmetry giving it."""
+    best = (own, opp, 0)
+    for sym in range(1, 8):
+        candidate = (transform(own, sym), transform(opp, sym), sym)
+        if candidate < best:
+            best = candidate
+    return best
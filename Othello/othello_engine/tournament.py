@@ -0,0 +1,266 @@
+"""Headless self-play tournaments between engine configurations.
+
+Usage (from the folder containing othello_engine)::
+
+    python -m othello_engine.tournament "fast:time=0.1" "deep:time=0.1,eval=disc" --games 200 --out games.jsonl
+
+Each engine is written as ``name:key=value,...`` with the keys ``depth``, ``time`` (seconds per
+move), ``eval`` (``pattern`` or ``disc``), ``book`` (``1`` or ``0``) and ``endgame`` (empties at
+which the exact solver takes over). Every pair of engines plays ``--games`` games from random
+openings, each opening once with either colour. Games run in a process pool. One record per game
+is appended to ``--out`` (JSON lines, or CSV when the file name ends in ``.csv``) as soon as the
+game finishes, and nothing but win/draw/loss counts is kept in memory. At the end the score of
+each pair is printed with an Elo estimate and a 95% error bar.
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import combinations, islice
+from typing import NamedTuple, Optional
+
+from .bitboard import square_name
+from .book import load_book
+from .endgame import DEFAULT_ENDGAME_EMPTIES
+from .evaluate import disc_difference, evaluate
+from .position import Position
+from .search import Searcher
+
+EVALUATORS = {'pattern': evaluate, 'disc': disc_difference}
+CSV_FIELDS = ('game', 'black', 'white', 'opening', 'moves', 'black_discs', 'white_discs', 'result',
+              'nodes', 'times')
+
+
+class EngineConfig(NamedTuple):
+    """Settings of one tournament engine."""
+
+    name: str
+    depth: Optional[int] = None  # No limit but the time
+    time_limit: Optional[float] = 0.1
+    evaluator: str = 'pattern'
+    book: bool = False
+    endgame_empties: int = DEFAULT_ENDGAME_EMPTIES
+
+    @classmethod
+    def parse(cls, text):
+        """Parse ``name:key=value,...`` as described in the module docstring."""
+        name, _, options = text.partition(':')
+        config = cls(name)
+        for option in filter(None, options.split(',')):
+            key, _, value = option.partition('=')
+            if key == 'depth':
+                config = config._replace(depth=int(value))
+            elif key == 'time':
+                config = config._replace(time_limit=float(value) if value != 'none' else None)
+            elif key == 'eval':
+                if value not in EVALUATORS:
+                    raise ValueError(f"unknown evaluator {value!r}, expected one of {', '.join(EVALUATORS)}")
+                config = config._replace(evaluator=value)
+            elif key == 'book':
+                config = config._replace(book=value not in ('0', 'no', 'false'))
+            elif key == 'endgame':
+                config = config._replace(endgame_empties=int(value))
+            else:
+                raise ValueError(f"unknown engine option {key!r} in {text!r}")
+        if config.depth is None and config.time_limit is None:
+            raise ValueError(f"engine {name!r} has neither a depth nor a time limit")
+        return config
+
+    def searcher(self):
+        """Return a fresh Searcher with these settings."""
+        return Searcher(EVALUATORS[self.evaluator], endgame_empties=self.endgame_empties,
+                        book=load_book() if self.book else None)
+
+
+def random_opening(rng, plies):
+    """Return a list of ``plies`` random legal moves from the starting position."""
+    position = Position.initial()
+    moves = []
+    while len(moves) < plies:
+        if position.must_pass():
+            position = position.pass_turn()
+        legal = position.legal_moves()
+        if not legal:
+            break
+        move = rng.choice(legal)
+        moves.append(move)
+        position = position.apply_move(move)
+    return moves
+
+
+def play_game(game, black, white, opening):
+    """Play one game between two EngineConfigs after the ``opening`` moves and return its record."""
+    engines = {'B': black.searcher(), 'W': white.searcher()}
+    limits = {'B': black, 'W': white}
+    position = Position.initial()
+    moves, nodes, times = [], [], []
+    for ply in range(len(opening) + 64):
+        if position.must_pass():
+            position = position.pass_turn()
+        if position.is_game_over():
+            break
+        if ply < len(opening):
+            move = opening[ply]
+        else:
+            config = limits[position.player]
+            start = time.perf_counter()
+            result = engines[position.player].search(position, config.depth, config.time_limit)
+            times.append(round(time.perf_counter() - start, 4))
+            nodes.append(result.nodes)
+            move = result.move
+        moves.append(move)
+        position = position.apply_move(move)
+    black_discs, white_discs = position.counts()
+    return {
+        'game': game,
+        'black': black.name,
+        'white': white.name,
+        'opening': ''.join(square_name(sq) for sq in opening),
+        'moves': ''.join(square_name(sq) for sq in moves),
+        'black_discs': black_discs,
+        'white_discs': white_discs,
+        'result': black_discs - white_discs,
+        'nodes': nodes,
+        'times': times,
+    }
+
+
+def schedule(configs, games, opening_plies, seed):
+    """Yield (game, black, white, opening) for every game of the tournament."""
+    rng = random.Random(seed)
+    game = 0
+    for first, second in combinations(configs, 2):
+        for i in range(games):
+            if i % 2 == 0:
+                opening = random_opening(rng, opening_plies)
+                yield game, first, second, opening
+            else:
+                yield game, second, first, opening  # The same opening with the colours swapped
+            game += 1
+
+
+def elo(score):
+    """Elo difference implied by an expected score between 0 and 1."""
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1) + 0.0  # + 0.0 turns the -0.0 of an even score into 0.0
+
+
+class PairStats:
+    """Win/draw/loss counts of one engine against another, from the first engine's side."""
+
+    def __init__(self):
+        self.wins = self.draws = self.losses = 0
+
+    def add(self, outcome):
+        """Record 1 for a win, 0.5 for a draw or 0 for a loss."""
+        if outcome == 1:
+            self.wins += 1
+        elif outcome == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def summary(self):
+        """Return (score, elo, elo_error) with a 95% error bar from the per-game score variance.
+
+        ``elo_error`` is None when the games cannot bound the difference: when every game had the
+        same result, or when the error bar reaches a score of 0 or 1.
+        """
+        n = self.games
+        score = (self.wins + 0.5 * self.draws) / n
+        variance = (self.wins * (1 - score) ** 2 + self.draws * (0.5 - score) ** 2
+                    + self.losses * score ** 2) / n
+        margin = 1.96 * math.sqrt(variance / n)
+        if variance == 0 or score - margin <= 0 or score + margin >= 1:
+            return score, elo(score), None
+        return score, elo(score), (elo(score + margin) - elo(score - margin)) / 2
+
+
+class RecordWriter:
+    """Append game records to a JSON lines or CSV file, flushing after every game."""
+
+    def __init__(self, path):
+        self.csv = path.endswith('.csv')
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline='' if self.csv else None)
+        if self.csv:
+            self.writer = csv.DictWriter(self.file, CSV_FIELDS)
+            if new_file:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.csv:
+            self.writer.writerow(dict(record, nodes=' '.join(map(str, record['nodes'])),
+                                      times=' '.join(map(str, record['times']))))
+        else:
+            self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def run(configs, games, out, workers=None, opening_plies=6, seed=0, log=sys.stdout):
+    """Play the tournament, streaming records to ``out``, and return {(name, name): PairStats}."""
+    stats = {(a.name, b.name): PairStats() for a, b in combinations(configs, 2)}
+    total = games * len(stats)
+    workers = workers or os.cpu_count() or 1
+    specs = schedule(configs, games, opening_plies, seed)
+    writer = RecordWriter(out)
+    done = 0
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            # Only a few games per worker are queued at a time, so memory does not grow with the tournament
+            pending = {pool.submit(play_game, *spec) for spec in islice(specs, 2 * workers)}
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    writer.write(record)
+                    done += 1
+                    black_outcome = 1 if record['result'] > 0 else 0 if record['result'] < 0 else 0.5
+                    if (record['black'], record['white']) in stats:
+                        stats[record['black'], record['white']].add(black_outcome)
+                    else:
+                        stats[record['white'], record['black']].add(1 - black_outcome)
+                    print(f"game {record['game']} done ({done}/{total}): {record['black']} "
+                          f"{record['black_discs']}-{record['white_discs']} {record['white']}", file=log)
+                pending.update(pool.submit(play_game, *spec) for spec in islice(specs, len(finished)))
+    finally:
+        writer.close()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('engines', nargs='+', metavar='ENGINE', help="engine as name:key=value,...")
+    parser.add_argument('--games', type=int, default=100, help="games per pair of engines")
+    parser.add_argument('--out', default='tournament.jsonl', help="file the game records are appended to")
+    parser.add_argument('--workers', type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument('--opening-plies', type=int, default=6, help="random moves before the engines take over")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the openings")
+    args = parser.parse_args(argv)
+
+    configs = [EngineConfig.parse(text) for text in args.engines]
+    if len(configs) < 2 or len({config.name for config in configs}) != len(configs):
+        parser.error("give at least two engines with different names")
+    stats = run(configs, args.games, args.out, args.workers, args.opening_plies, args.seed)
+    for (first, second), pair in stats.items():
+        if pair.games:
+            score, difference, error = pair.summary()
+            print(f"{first} vs {second}: +{pair.wins} ={pair.draws} -{pair.losses} "
+                  f"score {score:.3f}, Elo {difference:+.0f} +/- {'n/a' if error is None else f'{error:.0f}'}")
+
+
+if __name__ == '__main__':
+    main()
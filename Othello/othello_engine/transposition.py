@@ -0,0 +1,94 @@
+"""Fixed-size transposition table for the alpha-beta search."""
+
+from array import array
+
+# Bound types stored with each score
+EXACT = 0  # The score is exact
+LOWER = 1  # The search failed high: the true score is at least this value
+UPPER = 2  # The search failed low: the true score is at most this value
+
+NO_MOVE = -1  # Stored when an entry has no best move (e.g. a pass or a leaf)
+DEFAULT_SIZE_MB = 16  # Default memory cap of a table in megabytes
+ENTRY_BYTES = 8 + 1 + 1 + 4 + 1  # key, depth, bound, score and move of one slot
+
+
+class TranspositionTable:
+    """Two-slot buckets: one depth-preferred slot and one always-replace slot.
+
+    Entries live in flat typed arrays, so the memory used never grows past ``size_mb``.
+    Probe and store statistics are kept in ``probes``, ``hits``, ``cutoffs`` and ``stores``.
+    """
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        buckets = 1
+        while buckets * 4 * ENTRY_BYTES <= size_mb * 1024 * 1024:
+            buckets *= 2  # Largest power of two number of buckets that fits in the memory cap
+        self.mask = buckets - 1
+        slots = buckets * 2
+        self.keys = array('Q', bytes(8 * slots))
+        self.depths = array('b', bytes(slots))
+        self.bounds = array('b', bytes(slots))
+        self.scores = array('i', bytes(4 * slots))
+        self.moves = array('b', bytes(slots))
+        self.reset_stats()
+
+    def __len__(self):
+        """Number of slots in the table."""
+        return len(self.keys)
+
+    def reset_stats(self):
+        """Zero the hit and cutoff counters."""
+        self.probes = 0  # Number of lookups
+        self.hits = 0  # Lookups that found the position
+        self.cutoffs = 0  # Hits whose score ended the search of the node straight away
+        self.stores = 0  # Number of entries written
+
+    def clear(self):
+        """Forget every entry and reset the statistics."""
+        slots = len(self.keys)
+        self.keys = array('Q', bytes(8 * slots))
+        self.depths = array('b', bytes(slots))
+        self.reset_stats()
+
+    def probe(self, key):
+        """Return the slot index holding ``key``, or -1 if the position is not stored."""
+        self.probes += 1
+        slot = (key & self.mask) << 1
+        if self.keys[slot] == key:
+            self.hits += 1
+            return slot
+        slot += 1
+        if self.keys[slot] == key:
+            self.hits += 1
+            return slot
+        return -1
+
+    def store(self, key, depth, bound, score, move):
+        """Save a search result, replacing the depth-preferred slot only with an equal or deeper result."""
+        self.stores += 1
+        slot = (key & self.mask) << 1
+        if self.keys[slot] != key and self.depths[slot] > depth:
+            slot += 1  # Keep the deeper entry and use the always-replace slot
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.bounds[slot] = bound
+        self.scores[slot] = score
+        self.moves[slot] = move
+
+    def best_move(self, key):
+        """Return the stored best move for ``key``, or None."""
+        slot = self.probe(key)
+        if slot < 0 or self.moves[slot] == NO_MOVE:
+            return None
+        return self.moves[slot]
+
+    def stats(self):
+        """Return the table counters as a dict, including the hit rate."""
+        return {
+            'slots': len(self.keys),
+            'probes': self.probes,
+            'hits': self.hits,
+            'cutoffs': self.cutoffs,
+            'stores': self.stores,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+        }
@@ -0,0 +1,45 @@
+"""Zobrist hashing of Othello positions.
+
+Every (colour, square) pair gets a random 64-bit key and the key of a position is the XOR of
+the keys of its discs, plus ``SIDE_KEY`` when White is to move. Keys are updated incrementally
+as moves are played instead of being recomputed from the whole board.
+"""
+
+import random
+
+from .bitboard import iter_squares
+
+BLACK, WHITE = 0, 1  # Colour indexes into DISC_KEYS
+
+_rng = random.Random(0x07E110)  # Fixed seed so that keys, and therefore saved tables, are stable between runs
+DISC_KEYS = (
+    tuple(_rng.getrandbits(64) for _ in range(64)),  # Black disc on each square
+    tuple(_rng.getrandbits(64) for _ in range(64)),  # White disc on each square
+)
+FLIP_KEYS = tuple(b ^ w for b, w in zip(*DISC_KEYS))  # Turning a disc over toggles both colour keys
+SIDE_KEY = _rng.getrandbits(64)  # Toggled whenever the side to move changes
+
+
+def colour_index(player):
+    """Return the DISC_KEYS index of 'B' or 'W'."""
+    return BLACK if player == 'B' else WHITE
+
+
+def position_key(position):
+    """Compute the Zobrist key of a Position from scratch."""
+    key = SIDE_KEY if position.player == 'W' else 0
+    for sq in iter_squares(position.black):
+        key ^= DISC_KEYS[BLACK][sq]
+    for sq in iter_squares(position.white):
+        key ^= DISC_KEYS[WHITE][sq]
+    return key
+
+
+def update_key(key, colour, sq, flipped):
+    """Return the key after ``colour`` plays on ``sq`` and turns over the discs in ``flipped``."""
+    key ^= DISC_KEYS[colour][sq] ^ SIDE_KEY
+    while flipped:
+        low = flipped & -flipped
+        key ^= FLIP_KEYS[low.bit_length() - 1]
+        flipped ^= low
+    return key
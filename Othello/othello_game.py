@@ -1,9 +1,17 @@
+import os  # Import the os module to locate the game record file
+import queue  # Import the queue module to hand search results back to the Tk thread
+import threading  # Import the threading module to run the AI search in the background
 import tkinter as tk  # Import the tkinter library and alias it as tk
 from tkinter import ttk  # Import the ttk module from tkinter for themed widgets
 
+from othello_engine import BOARD_SIZE, Position, Searcher, iter_squares, load_book, row_col, square, square_name
+from othello_engine.records import GameWriter, make_record
+
 # Constants
-BOARD_SIZE = 8  # Define the size of the Othello board (8x8)
 SQUARE_SIZE = 60  # Define the size of each square on the board
+DIFFICULTY_TIME_LIMITS = {"Easy": 0.1, "Medium": 0.5, "Hard": 2.0}  # Seconds the AI may think per move
+POLL_INTERVAL_MS = 16  # How often the Tk loop checks for search progress (about 60 times a second)
+GAMES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "games.otg")  # Finished games are appended here
 
 
 class OthelloGUI:
@@ -11,8 +19,12 @@ class OthelloGUI:
         """Constructor method for initializing the GUI."""
         self.root = root  # Set the root window
         self.root.title("Othello")  # Set the title of the root window to "Othello"
-        self.current_player = 'B'  # Initialize the current player to Black ('B')
+        self.position = Position.initial()  # Initialize the game to the starting position, Black to move
         self.game_over = False  # Initialize the game over flag to False
+        self.searcher = Searcher(book=load_book(), instrument=True)
+        # AI search engine with the opening book, reused between moves, that keeps statistics of every search
+        self.search_queue = queue.Queue()  # Progress and results sent by the search thread
+        self.stop_event = None  # Event that cancels the running search, None when the AI is not thinking
 
         # Create welcome message
         self.welcome_label = tk.Label(root, text="Welcome to Othello!\nChoose your game mode to start.",
@@ -57,8 +69,7 @@ class OthelloGUI:
 
     def start_two_player_game(self):
         # Method to start the game in two player mode
-        self.create_game_interface()  # Call the method to create the game interface
-        self.current_player = 'B'  # Set the current player to Black ('B')
+        self.create_game_interface()  # Call the method to create the game interface (Black moves first)
         self.turn_label.config(text="Black's Turn")  # Set the turn label text to indicate Black's turn
 
     def start_vs_ai_game(self):
@@ -76,8 +87,18 @@ class OthelloGUI:
 
         self.create_game_interface()  # Call the method to create the game interface
 
+        # Create the AI status label and the button to stop the AI thinking
+        self.ai_status_label = tk.Label(self.root, text="", font=("Helvetica", 12), bg='#097969')
+        self.ai_status_label.pack()  # Pack the AI status label into the root window
+        self.stop_button = tk.Button(self.root, text="Stop Thinking", command=self.cancel_ai, state=tk.DISABLED)
+        self.stop_button.pack()  # Pack the stop button into the root window
+
+        # Create the panel showing how the last AI search went
+        self.stats_label = tk.Label(self.root, text="", font=("Courier", 10), bg='#097969', justify=tk.LEFT)
+        self.stats_label.pack()  # Pack the search statistics label into the root window
+
         # Start the AI's move immediately if it's the AI's turn
-        if self.current_player == 'B':  # If it's the AI's turn (Black)
+        if self.position.player == 'B':  # If it's the AI's turn (Black)
             self.ai_move()  # Call the method for AI to move immediately
 
 
@@ -93,12 +114,8 @@ class OthelloGUI:
         self.canvas.pack()  # Pack the canvas into the root window
 
         # Initialize game state and starting discs
-        self.board = [[' ' for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-        # Initialize the game board with empty cells
-        self.board[3][3] = 'W'  # Place initial white discs
-        self.board[3][4] = 'B'  # Place initial black discs
-        self.board[4][3] = 'B'  # Place initial black discs
-        self.board[4][4] = 'W'  # Place initial white discs
+        self.position = Position.initial()
+        self.moves = []  # Squares played so far, saved to the game record file when the game ends
 
         # Initialize count labels
         self.black_count_label = tk.Label(self.root, text="Black: 2", font=("Helvetica", 14), bg='#097969')
@@ -113,16 +130,18 @@ class OthelloGUI:
         # Create a label to display the current player's turn
         self.turn_label.pack()  # Pack the turn label into the root window
 
+        self.create_board_items()  # Call the method to create the items of the board
         self.draw_board()  # Call the method to draw the game board
 
         # Bind mouse click event to canvas
         self.canvas.bind("<Button-1>", self.handle_click)
         # Bind the left mouse click event to the handle_click method
 
-    def draw_board(self):
-        # Method to draw the game board
-        self.canvas.delete("all")  # Clear the canvas
+        # Stop any running search when the window is closed
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
+    def create_board_items(self):
+        # Method to create every canvas item of the board once; draw_board only reconfigures them later
         # Draw grid lines
         for i in range(BOARD_SIZE):
             self.canvas.create_line(0, i * SQUARE_SIZE, BOARD_SIZE * SQUARE_SIZE, i * SQUARE_SIZE)
@@ -130,43 +149,49 @@ class OthelloGUI:
             self.canvas.create_line(i * SQUARE_SIZE, 0, i * SQUARE_SIZE, BOARD_SIZE * SQUARE_SIZE)
             # Draw vertical lines
 
-        # Draw discs and legal moves
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                if self.board[i][j] == 'B':  # If the cell contains a black disc
-                    x = j * SQUARE_SIZE + SQUARE_SIZE // 2  # Calculate x-coordinate for the center of the disc
-                    y = i * SQUARE_SIZE + SQUARE_SIZE // 2  # Calculate y-coordinate for the center of the disc
-                    # Draw a black disc at the calculated position
-                    self.canvas.create_oval(x - SQUARE_SIZE // 2 + 5, y - SQUARE_SIZE // 2 + 5,
-                                            x + SQUARE_SIZE // 2 - 5, y + SQUARE_SIZE // 2 - 5,
-                                            fill='black')
-                elif self.board[i][j] == 'W':  # If the cell contains a white disc
-                    x = j * SQUARE_SIZE + SQUARE_SIZE // 2  # Calculate x-coordinate for the center of the disc
-                    y = i * SQUARE_SIZE + SQUARE_SIZE // 2  # Calculate y-coordinate for the center of the disc
-                    # Draw a white disc at the calculated position
-                    self.canvas.create_oval(x - SQUARE_SIZE // 2 + 5, y - SQUARE_SIZE // 2 + 5,
-                                            x + SQUARE_SIZE // 2 - 5, y + SQUARE_SIZE // 2 - 5,
-                                            fill='white')
-
-        # Draw legal moves
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                if self.is_valid_move(i, j):  # If the move is valid
-                    x = j * SQUARE_SIZE + SQUARE_SIZE // 2  # Calculate x-coordinate for the center of the square
-                    y = i * SQUARE_SIZE + SQUARE_SIZE // 2  # Calculate y-coordinate for the center of the square
-                    # Draw an 'X' at the calculated position to indicate a legal move
-                    self.canvas.create_text(x, y, text="X", font=("Helvetica", 16))
-
-        # Highlight current player's discs
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                if self.board[i][j] == self.current_player:  # If the disc belongs to the current player
-                    x = j * SQUARE_SIZE + SQUARE_SIZE // 2  # Calculate x-coordinate for the center of the disc
-                    y = i * SQUARE_SIZE + SQUARE_SIZE // 2  # Calculate y-coordinate for the center of the disc
-                    # Draw a yellow outline around the disc to highlight it
-                    self.canvas.create_oval(x - SQUARE_SIZE // 2 + 5, y - SQUARE_SIZE // 2 + 5,
-                                            x + SQUARE_SIZE // 2 - 5, y + SQUARE_SIZE // 2 - 5,
-                                            outline="yellow", width=2)
+        # One hidden disc and one hidden legal-move marker per square, indexed by square
+        self.disc_items = []
+        self.marker_items = []
+        for sq in range(BOARD_SIZE * BOARD_SIZE):
+            i, j = row_col(sq)  # Row and column of the square
+            x = j * SQUARE_SIZE + SQUARE_SIZE // 2  # Calculate x-coordinate for the center of the square
+            y = i * SQUARE_SIZE + SQUARE_SIZE // 2  # Calculate y-coordinate for the center of the square
+            # The disc, recoloured and tagged with its colour by draw_board
+            self.disc_items.append(self.canvas.create_oval(x - SQUARE_SIZE // 2 + 5, y - SQUARE_SIZE // 2 + 5,
+                                                           x + SQUARE_SIZE // 2 - 5, y + SQUARE_SIZE // 2 - 5,
+                                                           fill='black', state=tk.HIDDEN))
+            # The 'X' that marks a legal move
+            self.marker_items.append(self.canvas.create_text(x, y, text="X", font=("Helvetica", 16), state=tk.HIDDEN))
+
+        # Bitboards of what is currently shown: black discs, white discs and legal moves
+        self.shown = (0, 0, 0)
+
+    def draw_board(self):
+        # Method to bring the board up to date by reconfiguring only the squares that changed
+        self.canvas.delete("ai_best")  # Remove the outline of the AI's best move, if any
+        black, white = self.position.black, self.position.white
+        moves = self.position.move_mask()  # Legal moves, generated all at once from the bitboards
+        shown_black, shown_white, shown_moves = self.shown
+
+        # Placed and flipped discs: show them in their new colour
+        for sq in iter_squares((black ^ shown_black) | (white ^ shown_white)):
+            if (black | white) >> sq & 1:
+                colour = 'black' if black >> sq & 1 else 'white'
+                self.canvas.itemconfigure(self.disc_items[sq], fill=colour, tags=(colour,), state=tk.NORMAL)
+            else:
+                # An emptied square, which only happens when a new position is set up
+                self.canvas.itemconfigure(self.disc_items[sq], tags=(), state=tk.HIDDEN)
+
+        # Legal-move markers that appeared or disappeared
+        for sq in iter_squares(moves ^ shown_moves):
+            self.canvas.itemconfigure(self.marker_items[sq], state=tk.NORMAL if moves >> sq & 1 else tk.HIDDEN)
+
+        # Highlight current player's discs with a yellow outline; the colour tags do it in one call per colour
+        player, opponent = ('black', 'white') if self.position.player == 'B' else ('white', 'black')
+        self.canvas.itemconfigure(player, outline="yellow", width=2)
+        self.canvas.itemconfigure(opponent, outline="black", width=1)
+
+        self.shown = (black, white, moves)
 
     def handle_click(self, event):
         # Method to handle mouse clicks based on the game mode
@@ -190,8 +215,8 @@ class OthelloGUI:
 
     def handle_click_vs_ai(self, event):
         # Method to handle mouse clicks in Player vs AI mode
-        if self.game_over:
-            return  # If the game is over, ignore clicks
+        if self.game_over or self.stop_event is not None:
+            return  # If the game is over or the AI is thinking, ignore clicks
 
         col = event.x // SQUARE_SIZE  # Calculate the column index of the clicked square
         row = event.y // SQUARE_SIZE  # Calculate the row index of the clicked square
@@ -202,165 +227,136 @@ class OthelloGUI:
             self.draw_board()  # Redraw the game board
 
             # AI player's turn
-            if self.current_player == 'B' and not self.game_over:  # If it's the AI's turn and the game is not over
+            if self.position.player == 'B' and not self.game_over:  # If it's the AI's turn and the game is not over
                 self.ai_move()  # Start the AI's move immediately
 
-    def is_valid_move(self, row, col, board=None):
-        # Method to check if a move is valid
-        if board is None:
-            board = self.board  # If no board is provided, use the current game board
-
-        if board[row][col] != ' ':  # If the cell is not empty
-            return False  # The move is invalid
-
-        # Check in all four directions for valid moves
-        # Define directions: up, down, right, left
-        directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-        for dr, dc in directions:  # Loop through each direction
-            r, c = row + dr, col + dc  # Calculate the next cell in the direction
-            if 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE and board[r][c] != self.current_player and board[r][
-                c] != ' ':  # If the next cell belongs to the opponent
-                while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:  # Loop until the end of the board
-                    if board[r][c] == self.current_player:  # If a disc belonging to the current player is found
-                        return True  # The move is valid
-                    elif board[r][c] == ' ':  # If an empty cell is found
-                        break  # Break the loop
-                    r += dr  # Move to the next cell in the same direction
-                    c += dc
-        return False  # No valid move found
-
-    def make_move(self, row, col, board=None, player=None):
-        # Method to make a move on the game board
-        if board is None:
-            board = self.board  # If no board is provided, use the current game board
-        if player is None:
-            player = self.current_player  # If no player is provided, use the current player
-
-        board[row][col] = player  # Place the player's disc at the specified position
-
-        # Flip discs in all four directions
-        directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]  # Define directions: right, left, down, up
-        for dr, dc in directions:  # Loop through each direction
-            r, c = row + dr, col + dc  # Calculate the next cell in the direction
-            if 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE and board[r][c] != player and board[r][
-                c] != ' ':  # If the next cell belongs to the opponent
-                discs_to_flip = []  # Initialize a list to store discs to flip
-                while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:  # Loop until the end of the board
-                    if board[r][c] == player:  # If a disc belonging to the current player is found
-                        for flip_row, flip_col in discs_to_flip:  # Iterate over the discs to flip
-                            board[flip_row][flip_col] = player  # Flip the discs
-                        break  # Break the loop
-                    elif board[r][c] == ' ':  # If an empty cell is found
-                        break  # Break the loop
-                    discs_to_flip.append((r, c))  # Add the opponent's disc to the list
-                    r += dr  # Move to the next cell in the same direction
-                    c += dc
+    def is_valid_move(self, row, col):
+        # Method to check if a move is valid for the current player
+        if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
+            return False  # Clicks outside the board are never valid
+        return self.position.is_legal(square(row, col))
+
+    def make_move(self, row, col):
+        # Method to make a move for the current player on the game board
+        self.position = self.position.apply_move(square(row, col))  # Place the disc and flip discs
+        self.moves.append(square(row, col))  # Remember the move for the game record
+        if self.position.must_pass():
+            self.position = self.position.pass_turn()  # The opponent has no legal move and has to pass
 
         # Update counts and labels
-        black_count = sum(row.count('B') for row in board)  # Count black discs
-        white_count = sum(row.count('W') for row in board)  # Count white discs
+        black_count, white_count = self.position.counts()
         self.black_count_label.config(text=f"Black: {black_count}")  # Update black count label
         self.white_count_label.config(text=f"White: {white_count}")  # Update white count label
 
-        # Switch players
-        self.current_player = 'B' if player == 'W' else 'W'  # Switch current player
-
         # Update player turn label
-        self.turn_label.config(text=f"{self.current_player.capitalize()}'s Turn")
+        self.turn_label.config(text=f"{self.position.player.capitalize()}'s Turn")
 
         # Check for game end
         if self.check_game_over():  # If the game is over
             if not self.game_over:  # Check if game is already over
                 self.display_winner()  # Display the winner
                 self.game_over = True  # Set game_over flag to True
+                self.save_game()  # Keep the finished game
 
     def ai_move(self):
-        # Function to make a move for the AI player using the alpha-beta pruning algorithm
-        def alpha_beta_pruning(board, player, alpha, beta, depth):
-            # Check if depth limit reached or game over
-            if depth == 0 or not any(self.is_valid_move(row, col, board=board)
-                                     for row in range(BOARD_SIZE) for col in range(BOARD_SIZE)):
-                return self.evaluate(board, player)  # Evaluate the board state
-
-            if player == 'B':  # Maximize for Black player
-                max_eval = float('-inf')
-                for row in range(BOARD_SIZE):
-                    for col in range(BOARD_SIZE):
-                        if self.is_valid_move(row, col, board=board):
-                            new_board = [row[:] for row in board]  # Create a copy of the board
-                            self.make_move(row, col, board=new_board, player=player)  # Make the move
-                            # Recursively call alpha-beta pruning for the opponent
-                            eval_score = alpha_beta_pruning(new_board, 'W', alpha, beta, depth - 1)
-                            max_eval = max(max_eval, eval_score)  # Update the max evaluation score
-                            alpha = max(alpha, eval_score)  # Update alpha
-                            if beta <= alpha:
-                                break  # Beta cutoff
-                return max_eval
-
-            else:  # Minimize for White player
-                min_eval = float('inf')
-                for row in range(BOARD_SIZE):
-                    for col in range(BOARD_SIZE):
-                        if self.is_valid_move(row, col, board=board):
-                            new_board = [row[:] for row in board]  # Create a copy of the board
-                            self.make_move(row, col, board=new_board, player=player)  # Make the move
-                            # Recursively call alpha-beta pruning for the opponent
-                            eval_score = alpha_beta_pruning(new_board, 'B', alpha, beta, depth - 1)
-                            min_eval = min(min_eval, eval_score)  # Update the min evaluation score
-                            beta = min(beta, eval_score)  # Update beta
-                            if beta <= alpha:
-                                break  # Alpha cutoff
-                return min_eval
-
+        # Function to start the AI's alpha-beta search in a background thread
         # Difficulty Levels: Retrieve selected difficulty from dropdown menu
-        difficulty = self.difficulty_var.get()
-
-        depth = 3  # Default depth for medium difficulty
-        if difficulty == "Easy":
-            depth = 1  # Easy level
-        elif difficulty == "Hard":
-            depth = 5  # Hard level
-
-        # Find the best move for the computer player
-        best_move = None
-        best_eval = float('-inf')
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
-                if self.is_valid_move(row, col):
-                    new_board = [row[:] for row in self.board]  # Create a copy of the board
-                    self.make_move(row, col, board=new_board, player=self.current_player)  # Make the move
-                    # Call alpha-beta pruning to evaluate the move
-                    eval_score = alpha_beta_pruning(new_board, 'W', float('-inf'), float('inf'), depth)
-                    # If the evaluation score is better than the best evaluation score so far
-                    if eval_score > best_eval:
-                        best_eval = eval_score  # Update the best evaluation score
-                        best_move = (row, col)  # Update the best move
+        time_limit = DIFFICULTY_TIME_LIMITS.get(self.difficulty_var.get(), 0.5)  # Default to medium difficulty
+
+        # The search thread only sees an immutable snapshot of the position
+        self.stop_event = threading.Event()
+        worker = threading.Thread(target=self.run_search, args=(self.position, time_limit, self.stop_event),
+                                  daemon=True)
+        worker.start()
+
+        self.ai_status_label.config(text="AI is thinking...")  # Show that the search has started
+        self.stop_button.config(state=tk.NORMAL)  # Allow the user to stop the search
+        self.root.after(POLL_INTERVAL_MS, self.poll_search)  # Start polling for progress
+
+    def run_search(self, position, time_limit, stop_event):
+        # Method run in the search thread: never touches Tk, only posts messages to the queue
+        def report(result):
+            self.search_queue.put(("progress", position, result))  # Report every completed depth
+
+        result = self.searcher.search(position, time_limit=time_limit, on_iteration=report, stop_event=stop_event)
+        self.search_queue.put(("stats", position, self.searcher.stats))  # Report how the search went
+        self.search_queue.put(("done", position, result))  # Report the final result
+
+    def poll_search(self):
+        # Method called from the Tk event loop to pick up messages from the search thread
+        while True:
+            try:
+                kind, position, result = self.search_queue.get_nowait()
+            except queue.Empty:
+                break
+            if position != self.position:
+                continue  # Message about a search whose position is no longer on the board
+            if kind == "progress":
+                self.show_search_progress(result)
+            elif kind == "stats":
+                self.stats_label.config(text=result.format())  # Show the statistics of the finished search
+            else:
+                self.finish_ai_move(result)
+                return  # The search is over, so stop polling
+        self.root.after(POLL_INTERVAL_MS, self.poll_search)  # Check again on the next frame
+
+    def show_search_progress(self, result):
+        # Method to show the AI's current best move and search depth
+        if result.move is None:
+            return
+        self.ai_status_label.config(text=f"AI thinking: depth {result.depth}, best move {square_name(result.move)}")
+        # Outline the square of the current best move
+        self.canvas.delete("ai_best")
+        i, j = row_col(result.move)
+        self.canvas.create_rectangle(j * SQUARE_SIZE + 2, i * SQUARE_SIZE + 2,
+                                     (j + 1) * SQUARE_SIZE - 2, (i + 1) * SQUARE_SIZE - 2,
+                                     outline="orange", width=3, tags="ai_best")
+
+    def finish_ai_move(self, result):
+        # Method to play the move chosen by the search thread
+        self.stop_event = None  # The AI is no longer thinking
+        self.stop_button.config(state=tk.DISABLED)
+        self.ai_status_label.config(text="")
+        player = self.position.player
 
         # Make the best move found by the algorithm
-        if best_move:
-            self.make_move(best_move[0], best_move[1])  # Make the best move
+        if result.move is not None:
+            self.make_move(*row_col(result.move))  # Make the best move
             self.draw_board()  # Redraw the game board
 
-    # Function to evaluate the current state of the game board
-    def evaluate(self, board, player):
-        # Simple evaluation function: the difference between the number of player's disks and opponent's disks
-        player_count = sum(row.count(player) for row in board)  # Count the number of player's disks
-        opponent_count = sum(row.count('B' if player == 'W' else 'W') for row in board)  # Count the opponent's disks
-        return player_count - opponent_count  # Return the evaluation score
+            # Move again if the human player had no legal move and had to pass
+            if self.position.player == player and not self.game_over:
+                self.ai_move()
+
+    def cancel_ai(self):
+        # Method to stop the search early; the AI plays the best move found so far
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    def close(self):
+        # Method to stop any running search and close the window
+        self.cancel_ai()
+        self.root.destroy()
 
     # Function to check if the game is over
     def check_game_over(self):
-        # Check if there are valid moves for either player
-        black_moves = any(self.is_valid_move(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE))
-        white_moves = any(self.is_valid_move(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE))
-        # Return True if no valid moves for both players or if a player runs out of pieces, indicating game over
-        return not (black_moves or white_moves)
+        # Return True if neither player has a valid move
+        return self.position.is_game_over()
+
+    # Function to append the finished game to the game record file
+    def save_game(self):
+        try:
+            with GameWriter(GAMES_PATH) as writer:
+                writer.append(make_record(self.moves))
+        except (OSError, ValueError):
+            # The game is still shown; it is just not kept, e.g. when the folder is read-only or
+            # games.otg is not a game file
+            pass
 
     # Function to display the winner of the game
     def display_winner(self):
         # Count the number of black and white discs on the board
-        black_count = sum(row.count('B') for row in self.board)
-        white_count = sum(row.count('W') for row in self.board)
+        black_count, white_count = self.position.counts()
 
         # Determine the winner based on the disc count
         if black_count > white_count:
@@ -374,9 +370,11 @@ class OthelloGUI:
         winner_label = tk.Label(self.root, text=winner_text, font=("Helvetica", 16), bg='#097969')
         winner_label.pack()
 
-# Initialize the Tkinter root window and start the game
-root = tk.Tk()
-# Create an instance of the OthelloGUI class, passing the root window as an argument
-game = OthelloGUI(root)
-# Start the Tkinter event loop, which waits for user input and responds accordingly
-root.mainloop()
+
+if __name__ == "__main__":
+    # Initialize the Tkinter root window and start the game
+    root = tk.Tk()
+    # Create an instance of the OthelloGUI class, passing the root window as an argument
+    game = OthelloGUI(root)
+    # Start the Tkinter event loop, which waits for user input and responds accordingly
+    root.mainloop()
@@ -0,0 +1,22 @@
+"""Random games and positions shared by the tests."""
+
+from othello_engine.position import Position
+from othello_engine.symmetry import transform
+
+
+def random_game(rng, plies):
+    """Play up to ``plies`` random legal moves from the start; return (moves, final Position)."""
+    position = Position.initial()
+    moves = []
+    while len(moves) < plies and not position.is_game_over():
+        if position.must_pass():
+            position = position.pass_turn()
+        sq = rng.choice(position.legal_moves())
+        moves.append(sq)
+        position = position.apply_move(sq)
+    return moves, position
+
+
+def transform_position(position, sym):
+    """Apply symmetry ``sym`` to a Position."""
+    return Position(transform(position.black, sym), transform(position.white, sym), position.player)
@@ -0,0 +1,93 @@
+"""Tests of the opening book file: writing, symmetric lookups and empty books."""
+
+import random
+
+import pytest
+
+from othello_engine.book import OpeningBook, write_book
+from othello_engine.position import Position
+from othello_engine.symmetry import SQUARE_MAPS, canonical
+
+from .games import random_game, transform_position
+
+
+def leads_to_same_position(position, move, other):
+    """True if two moves of ``position`` give the same position up to symmetry."""
+    first, second = position.apply_move(move), position.apply_move(other)
+    return canonical(first.own, first.opp)[:2] == canonical(second.own, second.opp)[:2]
+
+
+@pytest.fixture
+def written(tmp_path):
+    """Write a book of random positions; return (path, {key: (position, move, score, depth, games)})."""
+    rng = random.Random(2024)
+    entries = {}  # The last record written for each canonical key is the one the book keeps
+    records = []
+    for _ in range(300):
+        _, position = random_game(rng, rng.randrange(20))
+        if position.must_pass():
+            position = position.pass_turn()
+        moves = position.legal_moves()
+        move = rng.choice(moves) if moves else None
+        score, depth, games = rng.randrange(-2000, 2000), rng.randrange(1, 20), rng.randrange(1, 1000)
+        own, opp, sym = canonical(position.own, position.opp)
+        records.append((own, opp, score, -1 if move is None else SQUARE_MAPS[sym][move], depth, games))
+        entries[own, opp] = (position, move, score, depth, games)
+    path = str(tmp_path / 'book.bin')
+    write_book(path, records)
+    return path, entries
+
+
+def test_records_are_stored_once_in_key_order(written):
+    path, entries = written
+    book = OpeningBook(path)
+    try:
+        assert len(book) == len(entries)
+        assert [record[:2] for record in book.records()] == sorted(entries)
+    finally:
+        book.close()
+
+
+def test_every_orientation_finds_its_entry(written):
+    path, entries = written
+    book = OpeningBook(path)
+    try:
+        for position, move, score, depth, games in entries.values():
+            for sym in range(8):
+                moved = transform_position(position, sym)
+                entry = book.lookup(moved)
+                assert entry is not None and tuple(entry[1:]) == (score, depth, games)
+                if move is None:
+                    assert entry.move is None
+                else:
+                    # In a symmetric position several squares are the same move
+                    assert moved.is_legal(entry.move)
+                    assert leads_to_same_position(moved, entry.move, SQUARE_MAPS[sym][move])
+    finally:
+        book.close()
+
+
+def test_unknown_position_is_not_found(written):
+    book = OpeningBook(written[0])
+    try:
+        assert book.lookup(Position(0, 0, 'B')) is None
+    finally:
+        book.close()
+
+
+def test_empty_book(tmp_path):
+    path = str(tmp_path / 'empty.bin')
+    write_book(path, [])
+    book = OpeningBook(path)
+    try:
+        assert len(book) == 0
+        assert book.lookup(Position.initial()) is None
+    finally:
+        book.close()
+
+
+def test_other_file_is_rejected(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'not a book at all')
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
@@ -0,0 +1,85 @@
+"""Tests of game records: the indexed game file, WTHOR and text round trips and crash recovery."""
+
+import os
+import random
+
+import pytest
+
+from othello_engine.records import (GAME_HEADER, GameFile, GameWriter, index_path, make_record, read_games,
+                                    write_games, write_games_as)
+
+from .games import random_game
+
+
+@pytest.fixture
+def records():
+    rng = random.Random(2024)
+    games = []
+    for game in range(50):
+        moves, _ = random_game(rng, 60 if game % 5 else rng.randrange(61))  # Some games are abandoned
+        games.append(make_record(moves, rng.randrange(1000), rng.randrange(5000), rng.randrange(5000)))
+    return games
+
+
+@pytest.mark.parametrize('name', ['games.otg', 'games.wtb'])
+def test_round_trip(tmp_path, records, name):
+    path = str(tmp_path / name)
+    assert write_games_as(path, records) == len(records)
+    assert list(read_games(path, strict=True)) == records
+
+
+def test_text_round_trip_keeps_moves_and_discs(tmp_path, records):
+    path = str(tmp_path / 'games.txt')
+    write_games_as(path, records)
+    anonymous = [record._replace(tournament=0, black_player=0, white_player=0) for record in records]
+    assert list(read_games(path, strict=True)) == anonymous
+
+
+def test_lost_index_is_rebuilt(tmp_path, records):
+    path = str(tmp_path / 'games.otg')
+    write_games(path, records)
+    os.remove(index_path(path))
+    with GameFile(path) as games:
+        assert len(games) == len(records)
+        assert games[-1] == records[-1]
+        assert list(games) == records
+
+
+def test_game_cut_short_by_a_crash_is_dropped(tmp_path, records):
+    path = str(tmp_path / 'games.otg')
+    write_games(path, records)
+    # A crash in the middle of a game leaves its header and part of its moves at the end of the file
+    cut = records[0]
+    with open(path, 'ab') as f:
+        f.write(GAME_HEADER.pack(len(cut.moves), cut.black_discs, cut.white_discs, 0, 0, 0) + cut.moves[:5])
+    with GameWriter(path) as writer:
+        writer.append(records[1])
+    os.remove(index_path(path))  # The rebuilt index only finds the new game if nothing is left of the cut one
+    with GameFile(path) as games:
+        assert list(games) == records + records[1:2]
+
+
+def test_empty_game_file(tmp_path):
+    path = str(tmp_path / 'empty.otg')
+    assert write_games(path, []) == 0
+    with GameFile(path) as games:
+        assert len(games) == 0
+        assert list(games) == []
+
+
+@pytest.mark.parametrize('data', [b'ab', b'not a game file'])
+def test_other_file_is_rejected(tmp_path, data):
+    path = tmp_path / 'other.otg'
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        GameFile(str(path))
+    with pytest.raises(ValueError):
+        GameWriter(str(path))
+
+
+def test_positions_replay_every_move(tmp_path, records):
+    path = str(tmp_path / 'games.otg')
+    write_games(path, records[:5])
+    with GameFile(path) as games:
+        moves = [sq for _, _, sq in games.positions()]
+    assert moves == [sq for record in records[:5] for sq in record.moves]
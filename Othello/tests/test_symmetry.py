@@ -0,0 +1,45 @@
+"""Tests of the eight board symmetries and canonical forms."""
+
+import random
+
+import pytest
+
+from othello_engine.symmetry import INVERSE_SQUARE_MAPS, SQUARE_MAPS, canonical, inverse, transform
+
+from .games import random_game
+
+
+@pytest.fixture
+def positions():
+    rng = random.Random(2024)
+    return [random_game(rng, rng.randrange(61))[1] for _ in range(100)]
+
+
+@pytest.mark.parametrize('sym', range(8))
+def test_square_maps_are_undone_by_their_inverses(sym):
+    assert sorted(SQUARE_MAPS[sym]) == list(range(64))
+    assert [INVERSE_SQUARE_MAPS[sym][SQUARE_MAPS[sym][sq]] for sq in range(64)] == list(range(64))
+
+
+@pytest.mark.parametrize('sym', range(8))
+def test_square_maps_follow_the_bitboard_transform(sym):
+    assert all(transform(1 << sq, sym) == 1 << SQUARE_MAPS[sym][sq] for sq in range(64))
+
+
+@pytest.mark.parametrize('sym', range(8))
+def test_inverse_undoes_transform(positions, sym):
+    for position in positions:
+        assert inverse(transform(position.black, sym), sym) == position.black
+
+
+def test_canonical_symmetry_gives_the_canonical_form(positions):
+    for position in positions:
+        own, opp, sym = canonical(position.own, position.opp)
+        assert (transform(position.own, sym), transform(position.opp, sym)) == (own, opp)
+
+
+def test_all_symmetric_forms_share_one_canonical_form(positions):
+    for position in positions:
+        form = canonical(position.own, position.opp)[:2]
+        for sym in range(8):
+            assert canonical(transform(position.own, sym), transform(position.opp, sym))[:2] == form